@@ -1,19 +1,23 @@
-from typing import TypedDict, Annotated, Sequence, Dict, Any
+from typing import TypedDict, Annotated, Sequence, Dict, Any, Iterator
+import os
 from typing_extensions import TypedDict
 import operator
 from datetime import datetime
 import logging
+import time
 
-from langchain_core.messages import HumanMessage, AIMessage
-from langchain_google_vertexai import ChatVertexAI
+from langchain_core.messages import HumanMessage, AIMessage, AIMessageChunk
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from langchain_chroma import Chroma
-import vertexai
-import os
-from langchain_google_vertexai import VertexAIEmbeddings
-from pathlib import Path
+
+from src.utils.registry import get_chat_llm, get_embeddings, get_query_cache, get_history_manager
+from src.chat.retrieval import hybrid_search, looks_like_identifier
+from src.chat.query_cache import QueryCache, history_fingerprint
+from src.chat.history import estimate_tokens
+from src.chat.context import assemble_context
+from src.chat.multi_query import multi_query_search
 
 import dotenv
 dotenv.load_dotenv()
@@ -26,23 +30,23 @@ logger = logging.getLogger(__name__)
 class AgentState(TypedDict):
     messages: Sequence[HumanMessage | AIMessage]
     context: list[str]
+    context_ids: list[str]
+    history_summary: str
+    prompt_messages: Sequence[HumanMessage | AIMessage]
     current_time: str
+    collection_name: str
+    source_ids: list[str] | None
+    multi_query: bool
 
-# Initialize components
-llm = ChatVertexAI(
-    model="gemini-1.5-flash-002",
-    max_output_tokens=1024,
-    temperature=0,
-)
+# Components are created lazily and shared process-wide through the registry
+def get_llm():
+    """Return the shared chat model."""
+    return get_chat_llm(max_output_tokens=1024, temperature=0)
 
-embeddings = VertexAIEmbeddings(model_name="text-embedding-005")
-
-vectordb = Chroma(
-    persist_directory=str(Path(".cache/vectordb")),
-    collection_name=f"document_chunks",
-    embedding_function=embeddings
-)
-retriever = vectordb.as_retriever(search_kwargs={"k": 4})
+RETRIEVAL_K = 4
+CONTEXT_TOKEN_BUDGET = int(os.getenv("NOTEBOOKLM_CONTEXT_TOKEN_BUDGET", "3000"))
+MULTI_QUERY = os.getenv("NOTEBOOKLM_MULTI_QUERY", "0") == "1"
+MULTI_QUERY_K = 8
 
 
 # Create the chat prompt
@@ -53,6 +57,9 @@ chat_prompt = ChatPromptTemplate.from_messages([
     
     Current time: {current_time}
     
+    Summary of the earlier conversation:
+    {history_summary}
+    
     Context from documents:
     {context}
     """),
@@ -60,40 +67,116 @@ chat_prompt = ChatPromptTemplate.from_messages([
 ])
 
 # Define RAG functions
+def _retrieve(state: AgentState, search, cache_tag: str = "") -> AgentState:
+    """Run a retrieval function through the query cache and assemble the context."""
+    # Get the last message
+    last_message = state["messages"][-1]
+    logger.info(f"Retrieving context for message: {last_message.content}")
+    if not isinstance(last_message, HumanMessage):
+        return state
+    
+    # Hybrid BM25 + vector search of the notebook's collection, restricted to its active sources
+    source_ids = state.get("source_ids")
+    if source_ids is not None and not source_ids:
+        state["context"] = []
+        state["context_ids"] = []
+        logger.info("No active sources, skipping retrieval")
+        return state
+    collection_name = state.get("collection_name") or "document_chunks"
+    query = last_message.content
+    
+    # Repeated and near-duplicate questions reuse earlier retrievals; identifier
+    # queries go straight to BM25 and are not worth an embedding call
+    query_cache = get_query_cache()
+    scope = QueryCache.scope(collection_name, source_ids) + (cache_tag,)
+    results = query_cache.get_retrieval(scope, query)
+    if results is None:
+        query_embedding = None if looks_like_identifier(query) else get_embeddings().embed_query(query)
+        if query_embedding is not None:
+            results = query_cache.get_similar_retrieval(scope, query_embedding)
+        if results is None:
+            results = search(query, collection_name, source_ids, query_embedding)
+            query_cache.put_retrieval(scope, query, query_embedding, results)
+    context = [doc.page_content for doc in assemble_context(results, token_budget=CONTEXT_TOKEN_BUDGET)]
+    
+    # Update state
+    state["context"] = context
+    state["context_ids"] = [doc.metadata.get("chunk_id", "") for doc in results]
+    logger.info(f"Retrieved {len(context)} context chunks")
+    return state
+
 def retrieve_context(state: AgentState) -> AgentState:
     """Retrieve relevant context from vector store."""
     try:
-        # Get the last message
-        last_message = state["messages"][-1]
-        logger.info(f"Retrieving context for message: {last_message.content}")
-        if not isinstance(last_message, HumanMessage):
-            return state
-        
-        # Search vectordb
-        results = retriever.invoke(last_message.content)
-        context = [doc.page_content for doc in results]
-        
-        # Update state
-        state["context"] = context
-        logger.info(f"Retrieved {len(context)} context chunks")
-        return state
+        return _retrieve(state, lambda query, collection_name, source_ids, query_embedding: hybrid_search(
+            query,
+            collection_name=collection_name,
+            k=RETRIEVAL_K,
+            source_ids=source_ids,
+            query_embedding=query_embedding
+        ))
     except Exception as e:
         logger.error(f"Error in retrieve_context: {str(e)}")
         raise
 
-def generate_response(state: AgentState) -> AgentState:
+def multi_query_retrieve(state: AgentState) -> AgentState:
+    """Retrieve context for the question and model-generated sub-queries in parallel."""
+    try:
+        return _retrieve(state, lambda query, collection_name, source_ids, query_embedding: multi_query_search(
+            query,
+            collection_name=collection_name,
+            k=MULTI_QUERY_K,
+            source_ids=source_ids,
+            question_embedding=query_embedding
+        ), cache_tag="multi_query")
+    except Exception as e:
+        logger.error(f"Error in multi_query_retrieve: {str(e)}")
+        raise
+
+def route_retrieval(state: AgentState) -> str:
+    """Pick the retrieval node for a request."""
+    return "multi_query_retrieve" if state.get("multi_query") else "retrieve_context"
+
+def _format_context(state: AgentState) -> str:
+    return "\n\n".join(state["context"]) if state["context"] else "No relevant context found."
+
+def window_history(state: AgentState) -> AgentState:
+    """Fit the chat history into the prompt token budget left by the retrieved context."""
+    try:
+        reserved = estimate_tokens(chat_prompt.messages[0].prompt.template) + estimate_tokens(_format_context(state))
+        summary, prompt_messages = get_history_manager().window(state["messages"], reserved_tokens=reserved)
+        state["history_summary"] = summary
+        state["prompt_messages"] = prompt_messages
+        return state
+    except Exception as e:
+        logger.error(f"Error in window_history: {str(e)}")
+        raise
+
+def generate_response(state: AgentState, config: RunnableConfig) -> AgentState:
     """Generate response using context and chat history."""
     try:
         # Format context
-        context_str = "\n\n".join(state["context"]) if state["context"] else "No relevant context found."
+        context_str = _format_context(state)
+        
+        # The same question over the same chunks and conversation gets the cached answer
+        query_cache = get_query_cache()
+        scope = QueryCache.scope(state.get("collection_name") or "document_chunks", state.get("source_ids"))
+        query = state["messages"][-1].content
+        context_ids = state.get("context_ids") or []
+        history = history_fingerprint(state["messages"][:-1])
+        response = query_cache.get_answer(scope, query, context_ids, history)
         
         # Generate response
-        chain = chat_prompt | llm | StrOutputParser()
-        response = chain.invoke({
-            "messages": state["messages"],
-            "context": context_str,
-            "current_time": state["current_time"]
-        })
+        if response is None:
+            chain = chat_prompt | get_llm() | StrOutputParser()
+            # Passing the config through lets graph.stream() surface the model's tokens
+            response = chain.invoke({
+                "messages": state.get("prompt_messages") or state["messages"],
+                "history_summary": state.get("history_summary") or "None",
+                "context": context_str,
+                "current_time": state["current_time"]
+            }, config=config)
+            query_cache.put_answer(scope, query, context_ids, history, response)
         
         # Add response to messages
         state["messages"].append(AIMessage(content=response))
@@ -108,47 +191,75 @@ workflow = StateGraph(AgentState)
 
 # Add nodes
 workflow.add_node("retrieve_context", retrieve_context)
+workflow.add_node("multi_query_retrieve", multi_query_retrieve)
+workflow.add_node("window_history", window_history)
 workflow.add_node("generate_response", generate_response)
 
 # Add edges
-workflow.add_edge("retrieve_context", "generate_response")
+workflow.add_edge("retrieve_context", "window_history")
+workflow.add_edge("multi_query_retrieve", "window_history")
+workflow.add_edge("window_history", "generate_response")
 workflow.add_edge("generate_response", END)
 
-# Set entry point
-workflow.set_entry_point("retrieve_context")
+# Set entry point; multi-query retrieval is opt-in per request
+workflow.set_conditional_entry_point(route_retrieval, ["retrieve_context", "multi_query_retrieve"])
 
 # Compile the graph
 chain = workflow.compile()
 
-def chat_response(message: str, history: list[dict]) -> str:
+def _initial_state(
+    message: str,
+    history: list[dict],
+    collection_name: str,
+    source_ids: list[str] | None,
+    multi_query: bool | None = None
+) -> AgentState:
+    """Build the graph input from a message and the UI chat history."""
+    # Convert history to LangChain message format
+    messages = []
+    for msg in history:
+        if msg["role"] == "user":
+            messages.append(HumanMessage(content=msg["content"]))
+        else:
+            messages.append(AIMessage(content=msg["content"]))
+    
+    # Add current message
+    messages.append(HumanMessage(content=message))
+    
+    return {
+        "messages": messages,
+        "context": [],
+        "context_ids": [],
+        "history_summary": "",
+        "prompt_messages": [],
+        "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "collection_name": collection_name,
+        "source_ids": source_ids,
+        "multi_query": MULTI_QUERY if multi_query is None else multi_query
+    }
+
+def chat_response(
+    message: str,
+    history: list[dict],
+    collection_name: str = "document_chunks",
+    source_ids: list[str] | None = None,
+    multi_query: bool | None = None
+) -> str:
     """
     Process a chat message and return the response.
     
     Args:
         message: The user's message
         history: List of previous messages in the format [{"role": "user"|"assistant", "content": str}]
+        collection_name: Vector store collection of the active notebook
+        source_ids: Source IDs to restrict retrieval to; None searches the whole collection
+        multi_query: Retrieve for model-generated sub-queries too; defaults to NOTEBOOKLM_MULTI_QUERY
         
     Returns:
         str: The assistant's response
     """
     try:
-        # Convert history to LangChain message format
-        messages = []
-        for msg in history:
-            if msg["role"] == "user":
-                messages.append(HumanMessage(content=msg["content"]))
-            else:
-                messages.append(AIMessage(content=msg["content"]))
-        
-        # Add current message
-        messages.append(HumanMessage(content=message))
-        
-        # Prepare initial state
-        state = {
-            "messages": messages,
-            "context": [],
-            "current_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        state = _initial_state(message, history, collection_name, source_ids, multi_query)
         
         # Run the chain
         result = chain.invoke(state)
@@ -158,4 +269,55 @@ def chat_response(message: str, history: list[dict]) -> str:
         return result["messages"][-1].content
     except Exception as e:
         logger.error(f"Error in chat_response: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def chat_response_stream(
+    message: str,
+    history: list[dict],
+    collection_name: str = "document_chunks",
+    source_ids: list[str] | None = None,
+    multi_query: bool | None = None
+) -> Iterator[str]:
+    """
+    Process a chat message and yield the response as it is generated.
+    
+    Retrieval runs to completion first; the model's tokens are then yielded as
+    they arrive. Time to first token is logged for every request.
+    
+    Args:
+        message: The user's message
+        history: List of previous messages in the format [{"role": "user"|"assistant", "content": str}]
+        collection_name: Vector store collection of the active notebook
+        source_ids: Source IDs to restrict retrieval to; None searches the whole collection
+        multi_query: Retrieve for model-generated sub-queries too; defaults to NOTEBOOKLM_MULTI_QUERY
+        
+    Yields:
+        str: Chunks of the assistant's response
+    """
+    try:
+        state = _initial_state(message, history, collection_name, source_ids, multi_query)
+        started = time.perf_counter()
+        first_token_at = None
+        final_state = None
+        
+        for mode, payload in chain.stream(state, stream_mode=["messages", "values"]):
+            if mode == "values":
+                final_state = payload
+                continue
+            # Only model token chunks; the finished AIMessage added to the state is emitted too
+            chunk, metadata = payload
+            if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "generate_response" or not chunk.content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                logger.info(f"Time to first token: {first_token_at - started:.3f}s")
+            yield chunk.content
+        
+        # A cached answer is returned without calling the model, so nothing was streamed
+        if first_token_at is None and final_state is not None:
+            logger.info(f"Time to first token: {time.perf_counter() - started:.3f}s (cached answer)")
+            yield final_state["messages"][-1].content
+        logger.info(f"Streamed response in {time.perf_counter() - started:.3f}s")
+    except Exception as e:
+        logger.error(f"Error in chat_response_stream: {str(e)}")
+        raise
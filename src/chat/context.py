@@ -0,0 +1,124 @@
+from typing import List
+import logging
+
+from langchain_core.documents import Document
+
+from src.chat.history import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def _position(doc: Document) -> tuple:
+    return (doc.metadata.get("page") or 0, doc.metadata.get("start_index", 0))
+
+
+def merge_chunks(docs: List[Document]) -> List[Document]:
+    """
+    Merge overlapping and adjacent chunks of the same source and page.
+
+    Chunks are split with overlap, so neighbouring chunks retrieved together
+    repeat text. Chunks with a `start_index` are merged into contiguous spans
+    with the repeated part removed; chunks contained in another are dropped.
+    Chunks without a position (indexed before positions were recorded) are only
+    deduplicated by content.
+
+    Args:
+        docs: Retrieved chunks, most relevant first
+
+    Returns:
+        List[Document]: Merged spans, most relevant first; each span's `rank` metadata is
+        the best rank of the chunks it contains
+    """
+    groups = {}
+    unpositioned = []
+    seen_text = set()
+    for rank, doc in enumerate(docs):
+        if doc.page_content in seen_text:
+            continue
+        seen_text.add(doc.page_content)
+        if "start_index" not in doc.metadata:
+            unpositioned.append(Document(page_content=doc.page_content, metadata={**doc.metadata, "rank": rank}))
+            continue
+        key = (doc.metadata.get("source_id") or doc.metadata.get("source"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append((rank, doc))
+
+    spans = []
+    for members in groups.values():
+        members.sort(key=lambda member: member[1].metadata["start_index"])
+        current = None
+        for rank, doc in members:
+            start = doc.metadata["start_index"]
+            end = start + len(doc.page_content)
+            if current is not None and start <= current["end"]:
+                # Overlapping or touching: append only the part past the current span
+                if end > current["end"]:
+                    current["text"] += doc.page_content[current["end"] - start:]
+                    current["end"] = end
+                current["rank"] = min(current["rank"], rank)
+                current["merged"] += 1
+                continue
+            current = {"text": doc.page_content, "start": start, "end": end, "rank": rank, "merged": 1, "doc": doc}
+            spans.append(current)
+
+    merged = [
+        Document(
+            page_content=span["text"],
+            metadata={**span["doc"].metadata, "start_index": span["start"], "rank": span["rank"], "merged_chunks": span["merged"]}
+        )
+        for span in spans
+    ]
+    return sorted(merged + unpositioned, key=lambda doc: doc.metadata["rank"])
+
+
+def pack_context(docs: List[Document], token_budget: int) -> List[Document]:
+    """
+    Select the most relevant spans that fit a token budget, in document order.
+
+    Spans are taken by relevance while they fit; the most relevant span is
+    truncated if it alone exceeds the budget. The selection is then ordered by
+    source (most relevant source first), page and position, so the model reads
+    each document's passages in their original order.
+
+    Args:
+        docs: Spans from `merge_chunks`, most relevant first
+        token_budget: Maximum estimated tokens of the packed context
+
+    Returns:
+        List[Document]: Selected spans in document order
+    """
+    selected = []
+    used = 0
+    for doc in docs:
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens <= token_budget:
+            selected.append(doc)
+            used += tokens
+        elif not selected:
+            selected.append(Document(page_content=doc.page_content[:token_budget * 4], metadata=doc.metadata))
+            used = token_budget
+
+    source_rank = {}
+    for doc in selected:
+        source = doc.metadata.get("source_id") or doc.metadata.get("source")
+        source_rank.setdefault(source, len(source_rank))
+    selected.sort(key=lambda doc: (source_rank[doc.metadata.get("source_id") or doc.metadata.get("source")], _position(doc)))
+    return selected
+
+
+def assemble_context(docs: List[Document], token_budget: int = 3000) -> List[Document]:
+    """
+    Deduplicate, merge and pack retrieved chunks into the prompt context.
+
+    Args:
+        docs: Retrieved chunks, most relevant first
+        token_budget: Maximum estimated tokens of the assembled context
+
+    Returns:
+        List[Document]: Context passages in document order
+    """
+    merged = merge_chunks(docs)
+    packed = pack_context(merged, token_budget)
+    before = sum(estimate_tokens(doc.page_content) for doc in docs)
+    after = sum(estimate_tokens(doc.page_content) for doc in packed)
+    logger.info(f"Assembled context: {len(docs)} chunks into {len(packed)} passages, ~{before} -> ~{after} tokens")
+    return packed
@@ -0,0 +1,163 @@
+from typing import List, Sequence, Tuple
+import hashlib
+import logging
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from src.chat.query_cache import TTLCache
+from src.utils.registry import get_chat_llm
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(messages: Sequence[BaseMessage]) -> int:
+    # A few tokens of role and formatting overhead per message
+    return sum(estimate_tokens(message.content) + 4 for message in messages)
+
+
+summary_prompt = ChatPromptTemplate.from_template(
+    """Progressively summarize a conversation between a user and an AI assistant.
+Extend the current summary with the new lines, keeping facts, names, numbers,
+decisions and open questions the assistant may need later. Return only the
+updated summary, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+Updated summary:"""
+)
+
+
+class HistoryManager:
+    """
+    Fit a chat history into a prompt token budget.
+
+    The last `max_turns` turns are kept verbatim, as many as fit next to the
+    retrieved context. Older turns are folded into a rolling summary. Summaries
+    are cached under a fingerprint of the messages they cover, so every new
+    request only summarizes the turns that fell out of the window since the
+    previous one, and an unchanged history never calls the model again.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 6,
+        prompt_token_budget: int = 8000,
+        summary_max_tokens: int = 400,
+        max_cached_summaries: int = 256,
+        summary_ttl: float = 24 * 3600.0
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            max_turns: Maximum number of recent user/assistant turns kept verbatim
+            prompt_token_budget: Estimated tokens for history, summary and context together
+            summary_max_tokens: Upper bound on the rolling summary length
+            max_cached_summaries: Number of summaries kept before LRU eviction
+            summary_ttl: Seconds a cached summary stays valid
+        """
+        self.max_turns = max_turns
+        self.prompt_token_budget = prompt_token_budget
+        self.summary_max_tokens = summary_max_tokens
+        self._summaries = TTLCache(max_entries=max_cached_summaries, ttl=summary_ttl)
+        self.summary_calls = 0
+
+    def window(self, messages: Sequence[BaseMessage], reserved_tokens: int = 0) -> Tuple[str, List[BaseMessage]]:
+        """
+        Split a conversation into a summary of older turns and the recent messages.
+
+        Args:
+            messages: Full conversation, ending with the current user message
+            reserved_tokens: Tokens already taken by the system prompt and retrieved context
+
+        Returns:
+            Tuple[str, List[BaseMessage]]: Summary of the dropped turns ("" if none were
+            dropped) and the verbatim messages, always including the current one
+        """
+        if not messages:
+            return "", []
+        earlier, current = list(messages[:-1]), messages[-1]
+
+        # Start at a turn boundary at most max_turns turns back
+        start = self._turn_start(earlier, max(0, len(earlier) - 2 * self.max_turns))
+        available = self.prompt_token_budget - reserved_tokens - _message_tokens([current])
+        while start < len(earlier):
+            summary_tokens = self.summary_max_tokens if start else 0
+            if _message_tokens(earlier[start:]) + summary_tokens <= available:
+                break
+            start = self._turn_start(earlier, start + 1)
+
+        summary = self.summarize(earlier[:start]) if start else ""
+        if start:
+            logger.info(f"History window: {len(earlier) - start} verbatim messages, {start} summarized")
+        return summary, earlier[start:] + [current]
+
+    @staticmethod
+    def _turn_start(messages: Sequence[BaseMessage], index: int) -> int:
+        # First user message at or after index, so a window never opens on an assistant reply
+        while index < len(messages) and not isinstance(messages[index], HumanMessage):
+            index += 1
+        return index
+
+    def summarize(self, messages: Sequence[BaseMessage]) -> str:
+        """
+        Return the rolling summary of a conversation prefix.
+
+        Reuses the summary of the longest already summarized prefix and only feeds
+        the remaining messages to the model.
+
+        Args:
+            messages: Messages to summarize, oldest first
+
+        Returns:
+            str: Summary of the messages
+        """
+        fingerprints = [""]
+        hasher = hashlib.sha256()
+        for message in messages:
+            hasher.update(f"{message.type}\x00{message.content}\x01".encode("utf-8"))
+            fingerprints.append(hasher.hexdigest())
+
+        covered, summary = 0, ""
+        for end in range(len(messages), 0, -1):
+            cached = self._summaries.get(fingerprints[end])
+            if cached is not None:
+                covered, summary = end, cached
+                break
+        if covered == len(messages):
+            return summary
+
+        new_lines = "\n".join(
+            f"{'User' if isinstance(message, HumanMessage) else 'Assistant'}: {message.content}"
+            for message in messages[covered:]
+        )
+        try:
+            chain = summary_prompt | get_chat_llm(max_output_tokens=self.summary_max_tokens, temperature=0.0) | StrOutputParser()
+            summary = chain.invoke({
+                "summary": summary or "(empty)",
+                "new_lines": new_lines,
+                "max_words": int(self.summary_max_tokens * 0.75)
+            }).strip()
+        except Exception as e:
+            # Fall back to the last summary rather than failing the chat request
+            logger.warning(f"Error summarizing chat history: {str(e)}")
+            return summary
+        self.summary_calls += 1
+        self._summaries.put(fingerprints[-1], summary)
+        logger.info(f"Summarized {len(messages) - covered} chat messages into the rolling summary")
+        return summary
+
+    def get_stats(self) -> dict:
+        """Get summary cache size and number of summarization calls."""
+        return {"cached_summaries": len(self._summaries), "summary_calls": self.summary_calls}
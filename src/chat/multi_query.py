@@ -0,0 +1,167 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import logging
+import time
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from src.chat.retrieval import hybrid_search, doc_key
+from src.utils.registry import get_chat_llm, get_embeddings
+
+logger = logging.getLogger(__name__)
+
+expansion_prompt = ChatPromptTemplate.from_template(
+    """Write {n} different search queries that together cover the information needed
+to answer the question below. Use different wording and split compound questions
+into their parts. Return one query per line, with no numbering or extra text.
+
+Question: {question}"""
+)
+
+
+def expand_query(question: str, n: int = 3) -> List[str]:
+    """
+    Expand a question into sub-queries with the chat model.
+
+    Args:
+        question: User question
+        n: Number of sub-queries to ask for
+
+    Returns:
+        List[str]: The question followed by up to n distinct sub-queries
+    """
+    chain = expansion_prompt | get_chat_llm(max_output_tokens=256, temperature=0.0) | StrOutputParser()
+    try:
+        lines = chain.invoke({"question": question, "n": n}).splitlines()
+    except Exception as e:
+        # Retrieval with the question alone is still useful
+        logger.warning(f"Error expanding query: {str(e)}")
+        return [question]
+    queries = [question]
+    for line in lines:
+        line = line.strip().lstrip("-*0123456789.) ").strip()
+        if line and line.lower() not in {query.lower() for query in queries}:
+            queries.append(line)
+    return queries[:n + 1]
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray,
+    doc_embeddings: np.ndarray,
+    k: int = 4,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Select documents that are relevant to the query but not redundant with each other.
+
+    Keeps a running maximum similarity of every candidate to the selected set,
+    so each step costs one matrix-vector product.
+
+    Args:
+        query_embedding: Query vector, shape (dim,)
+        doc_embeddings: Candidate vectors, shape (n, dim)
+        k: Number of documents to select
+        lambda_mult: 1 ranks by relevance only, 0 by diversity only
+
+    Returns:
+        List[int]: Indices of the selected candidates, in selection order
+    """
+    if len(doc_embeddings) == 0:
+        return []
+    docs = doc_embeddings / np.maximum(np.linalg.norm(doc_embeddings, axis=1, keepdims=True), 1e-12)
+    query = query_embedding / max(float(np.linalg.norm(query_embedding)), 1e-12)
+    relevance = docs @ query
+
+    selected = []
+    redundancy = np.zeros(len(docs), dtype=relevance.dtype)
+    available = np.ones(len(docs), dtype=bool)
+    for _ in range(min(k, len(docs))):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        similarity = docs @ docs[best]
+        redundancy = similarity if len(selected) == 1 else np.maximum(redundancy, similarity)
+    return selected
+
+
+def _embed_and_search(
+    query: str,
+    embedding: Optional[List[float]],
+    collection_name: str,
+    source_ids: Optional[List[str]],
+    candidates: int
+) -> Tuple[List[float], List[Document]]:
+    if embedding is None:
+        embedding = get_embeddings().embed_query(query)
+    docs = hybrid_search(
+        query,
+        collection_name=collection_name,
+        k=candidates,
+        source_ids=source_ids,
+        query_embedding=embedding
+    )
+    return embedding, docs
+
+
+def multi_query_search(
+    question: str,
+    collection_name: str = "document_chunks",
+    k: int = 8,
+    source_ids: Optional[List[str]] = None,
+    n_queries: int = 3,
+    candidates: int = 10,
+    lambda_mult: float = 0.5,
+    question_embedding: Optional[List[float]] = None
+) -> List[Document]:
+    """
+    Retrieve chunks for a question and its sub-queries concurrently, diversified with MMR.
+
+    Args:
+        question: User question
+        collection_name: Vector store collection of the notebook
+        k: Number of chunks to return
+        source_ids: Restrict results to these sources; None searches everything
+        n_queries: Number of sub-queries to generate
+        candidates: Chunks retrieved per query
+        lambda_mult: MMR trade-off between relevance (1) and diversity (0)
+        question_embedding: Precomputed embedding of the question
+
+    Returns:
+        List[Document]: Selected chunks, in MMR selection order
+    """
+    started = time.perf_counter()
+    queries = expand_query(question, n=n_queries)
+    expanded = time.perf_counter()
+
+    # The embedding client and retrievers (SQLite and Chroma) are synchronous; threads let the
+    # queries overlap, and work whether or not the graph runs inside an event loop
+    with ThreadPoolExecutor(max_workers=len(queries), thread_name_prefix="multi_query") as executor:
+        results = list(executor.map(
+            lambda query, embedding: _embed_and_search(query, embedding, collection_name, source_ids, candidates),
+            queries,
+            [question_embedding] + [None] * (len(queries) - 1)
+        ))
+    embeddings = [embedding for embedding, _ in results]
+    unique = {}
+    for _, ranking in results:
+        for doc in ranking:
+            unique.setdefault(doc_key(doc), doc)
+    docs = list(unique.values())
+    if not docs:
+        return []
+
+    # Chunk embeddings come from the embedding cache filled at ingestion time
+    doc_embeddings = np.asarray(get_embeddings().embed_documents([doc.page_content for doc in docs]), dtype=np.float32)
+    query_embedding = np.asarray(embeddings[0], dtype=np.float32)
+    selected = maximal_marginal_relevance(query_embedding, doc_embeddings, k=k, lambda_mult=lambda_mult)
+
+    logger.info(
+        f"Multi-query retrieval: {len(queries)} queries, {len(docs)} candidates, {len(selected)} selected; "
+        f"expansion {expanded - started:.3f}s, retrieval {time.perf_counter() - expanded:.3f}s"
+    )
+    return [docs[i] for i in selected]
@@ -0,0 +1,215 @@
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Sequence
+import hashlib
+import logging
+import threading
+import time
+
+import numpy as np
+
+from src.utils.embedding_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a time to live."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before the least recently used is evicted
+            ttl: Seconds an entry stays valid after it is stored
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def items(self) -> list:
+        """Return the unexpired (key, value) pairs, least recently used first."""
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value) for key, (expires_at, value) in self._entries.items() if expires_at >= now]
+
+    def invalidate(self, predicate) -> int:
+        """Remove every entry whose key matches the predicate."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def history_fingerprint(messages: Sequence) -> str:
+    """Hash the role and content of every message of a conversation."""
+    hasher = hashlib.sha256()
+    for message in messages:
+        hasher.update(f"{message.type}\x00{message.content}\x01".encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class QueryCache:
+    """
+    Two-level cache for chat retrieval and answers, scoped per notebook.
+
+    Level one maps a query to its retrieved chunks. It is hit by an exact match
+    on the normalized query text, or by a near-duplicate query whose embedding
+    has at least `similarity_threshold` cosine similarity with a cached one.
+    Level two (optional) maps (normalized query, retrieved chunk IDs, history
+    fingerprint) to a generated answer.
+
+    Every entry is keyed on the notebook's collection and its active source
+    IDs, so switching sources never serves stale results, and the ingestion
+    pipeline calls `invalidate` whenever a collection's chunks change.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 3600.0,
+        similarity_threshold: float = 0.97,
+        answer_cache: bool = True,
+        answer_ttl: float = 3600.0
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum entries per level before LRU eviction
+            ttl: Seconds retrieval results stay valid
+            similarity_threshold: Minimum query embedding cosine similarity for a near-duplicate hit
+            answer_cache: Whether to cache generated answers (level two)
+            answer_ttl: Seconds cached answers stay valid
+        """
+        self.similarity_threshold = similarity_threshold
+        self.answer_cache_enabled = answer_cache
+        self._retrievals = TTLCache(max_entries=max_entries, ttl=ttl)
+        self._answers = TTLCache(max_entries=max_entries, ttl=answer_ttl)
+        self.hits = {"exact": 0, "similar": 0, "answer": 0}
+        self.misses = {"retrieval": 0, "answer": 0}
+
+    @staticmethod
+    def scope(collection_name: str, source_ids: Optional[List[str]]) -> tuple:
+        """Cache scope of a notebook: its collection plus the set of active sources."""
+        return (collection_name, None if source_ids is None else tuple(sorted(source_ids)))
+
+    def get_retrieval(self, scope: tuple, query: str) -> Optional[list]:
+        """
+        Look up retrieved chunks by exact match on the normalized query.
+
+        Args:
+            scope: Notebook scope from `scope`
+            query: User query
+
+        Returns:
+            Optional[list]: Cached documents, or None on a miss
+        """
+        entry = self._retrievals.get((scope, normalize_text(query).lower()))
+        if entry is None:
+            return None
+        self.hits["exact"] += 1
+        return entry[1]
+
+    def get_similar_retrieval(self, scope: tuple, query_embedding: List[float]) -> Optional[list]:
+        """
+        Look up retrieved chunks of the most similar cached query in a scope.
+
+        Args:
+            scope: Notebook scope from `scope`
+            query_embedding: Embedding of the user query
+
+        Returns:
+            Optional[list]: Cached documents if a query above the similarity threshold exists
+        """
+        # Entries stored without an embedding only serve exact matches
+        candidates = [
+            value for key, value in self._retrievals.items()
+            if key[0] == scope and value[0] is not None and value[0].shape == (len(query_embedding),)
+        ]
+        if not candidates:
+            return None
+        query_vector = np.asarray(query_embedding, dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        similarities = np.stack([vector for vector, _ in candidates]) @ query_vector
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        self.hits["similar"] += 1
+        logger.info(f"Near-duplicate query cache hit (similarity {similarities[best]:.3f})")
+        return candidates[best][1]
+
+    def put_retrieval(self, scope: tuple, query: str, query_embedding: Optional[List[float]], documents: list):
+        """Cache retrieved chunks for a query (near-duplicate matching needs its embedding)."""
+        self.misses["retrieval"] += 1
+        vector = None
+        if query_embedding is not None:
+            vector = np.asarray(query_embedding, dtype=np.float32)
+            vector /= max(float(np.linalg.norm(vector)), 1e-12)
+        self._retrievals.put((scope, normalize_text(query).lower()), (vector, documents))
+
+    def _answer_key(self, scope: tuple, query: str, chunk_ids: List[str], history: str) -> tuple:
+        return (scope, normalize_text(query).lower(), tuple(chunk_ids), history)
+
+    def get_answer(self, scope: tuple, query: str, chunk_ids: List[str], history: str) -> Optional[str]:
+        """Look up a generated answer; None on a miss or when answer caching is disabled."""
+        if not self.answer_cache_enabled:
+            return None
+        answer = self._answers.get(self._answer_key(scope, query, chunk_ids, history))
+        if answer is None:
+            self.misses["answer"] += 1
+        else:
+            self.hits["answer"] += 1
+        return answer
+
+    def put_answer(self, scope: tuple, query: str, chunk_ids: List[str], history: str, answer: str):
+        """Cache a generated answer."""
+        if self.answer_cache_enabled:
+            self._answers.put(self._answer_key(scope, query, chunk_ids, history), answer)
+
+    def invalidate(self, collection_name: Optional[str] = None) -> int:
+        """
+        Drop cached retrievals and answers of a collection (all collections if None).
+
+        Returns:
+            int: Number of entries removed
+        """
+        def matches(key):
+            return collection_name is None or key[0][0] == collection_name
+        removed = self._retrievals.invalidate(matches) + self._answers.invalidate(matches)
+        if removed:
+            logger.info(f"Invalidated {removed} query cache entries for {collection_name or 'all collections'}")
+        return removed
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counts and sizes of both cache levels."""
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "retrieval_entries": len(self._retrievals),
+            "answer_entries": len(self._answers),
+        }
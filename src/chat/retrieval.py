@@ -0,0 +1,98 @@
+from typing import List, Optional
+import logging
+import re
+
+from langchain_core.documents import Document
+
+from src.utils.registry import get_vectorstore, get_lexical_index, hold_collection
+
+logger = logging.getLogger(__name__)
+
+# A token mixing letters and digits (e.g. "E1234", "SKU-88A", "v2.1"), or an
+# all-caps code with a separator (e.g. "ERR_TIMEOUT")
+IDENTIFIER_PATTERN = re.compile(
+    r"^(?=[\w\-./]*\d)(?=[\w\-./]*[A-Za-z])[\w\-./]{2,}$|^[A-Z0-9]+(?:[-_./][A-Z0-9]+)+$"
+)
+
+
+def looks_like_identifier(query: str, max_words: int = 3) -> bool:
+    """Return True for short queries containing a part number, error code or similar identifier."""
+    words = query.strip().strip("?.!").split()
+    return 0 < len(words) <= max_words and any(IDENTIFIER_PATTERN.match(word.strip(",;:\"'()")) for word in words)
+
+
+def source_filter(source_ids: Optional[List[str]]) -> Optional[dict]:
+    """Build a Chroma metadata filter restricting search to the given sources."""
+    if source_ids is None:
+        return None
+    if len(source_ids) == 1:
+        return {"source_id": source_ids[0]}
+    return {"source_id": {"$in": list(source_ids)}}
+
+
+def doc_key(doc: Document) -> str:
+    """Identify a retrieved chunk across retrievers: its chunk ID, or its text for chunks without one."""
+    return doc.metadata.get("chunk_id") or doc.page_content
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """
+    Fuse several rankings of documents with reciprocal rank fusion.
+
+    Args:
+        rankings: Ranked document lists, best first
+        k: RRF damping constant; larger values flatten the contribution of top ranks
+
+    Returns:
+        List[Document]: Unique documents ordered by fused score
+    """
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc_key(doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            docs.setdefault(key, doc)
+    return [docs[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+def hybrid_search(
+    query: str,
+    collection_name: str = "document_chunks",
+    k: int = 4,
+    source_ids: Optional[List[str]] = None,
+    candidates: int = 20,
+    query_embedding: Optional[List[float]] = None
+) -> List[Document]:
+    """
+    Retrieve chunks by fusing BM25 and vector rankings.
+
+    Identifier-like queries take a lexical-only fast path with no embedding call,
+    falling back to hybrid search when BM25 finds nothing.
+
+    Args:
+        query: Search query
+        collection_name: Vector store collection of the notebook
+        k: Number of chunks to return
+        source_ids: Restrict results to these sources; None searches everything
+        candidates: Number of candidates taken from each ranking before fusion
+        query_embedding: Precomputed query embedding; skips embedding the query again
+
+    Returns:
+        List[Document]: Retrieved chunks, best first
+    """
+    if source_ids is not None and not source_ids:
+        return []
+
+    with hold_collection(collection_name):
+        lexical = [doc for doc, _ in get_lexical_index(collection_name).search(query, k=candidates, source_ids=source_ids)]
+        if lexical and looks_like_identifier(query):
+            logger.info(f"Identifier query, lexical-only retrieval: {query}")
+            return lexical[:k]
+
+        vectorstore = get_vectorstore(collection_name)
+        if query_embedding is not None:
+            vector = vectorstore.similarity_search_by_vector(query_embedding, k=candidates, filter=source_filter(source_ids))
+        else:
+            vector = vectorstore.similarity_search(query, k=candidates, filter=source_filter(source_ids))
+    return reciprocal_rank_fusion([vector, lexical])[:k]
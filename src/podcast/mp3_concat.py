@@ -0,0 +1,175 @@
+"""
+Frame-level MP3 concatenation.
+
+MPEG audio files are a sequence of self-contained frames, so files with the
+same format can be joined by copying frames, without decoding or re-encoding.
+Only MPEG Layer III (what Google TTS returns) is supported.
+"""
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, NamedTuple
+import math
+
+# Bitrates in kbps by [MPEG-1][bitrate index] for Layer III
+_BITRATES = {
+    True: [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    False: [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+# Sample rates in Hz by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+class Mp3FormatError(ValueError):
+    """Raised when a file is not Layer III MPEG audio or formats cannot be joined."""
+
+
+class Mp3Format(NamedTuple):
+    """The properties two files must share for their frames to be concatenated."""
+    version: int
+    sample_rate: int
+    mono: bool
+
+    @property
+    def samples_per_frame(self) -> int:
+        return 1152 if self.version == 3 else 576
+
+
+class FrameHeader(NamedTuple):
+    raw: bytes
+    format: Mp3Format
+    bitrate_index: int
+    length: int
+
+
+def parse_header(data: bytes, offset: int = 0) -> FrameHeader:
+    """Parse the 4-byte Layer III frame header at `offset`."""
+    if len(data) < offset + 4:
+        raise Mp3FormatError("Truncated frame header")
+    b1, b2, b3, b4 = data[offset:offset + 4]
+    if b1 != 0xFF or (b2 & 0xE0) != 0xE0:
+        raise Mp3FormatError(f"No frame sync at byte {offset}")
+    version = (b2 >> 3) & 0x03
+    layer = (b2 >> 1) & 0x03
+    bitrate_index = (b3 >> 4) & 0x0F
+    sample_rate_index = (b3 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        raise Mp3FormatError(f"Unsupported frame header at byte {offset}")
+    padding = (b3 >> 1) & 0x01
+    mono = (b4 >> 6) & 0x03 == 3
+    mpeg1 = version == 3
+    sample_rate = _SAMPLE_RATES[version][sample_rate_index]
+    bitrate = _BITRATES[mpeg1][bitrate_index] * 1000
+    length = (144 if mpeg1 else 72) * bitrate // sample_rate + padding
+    return FrameHeader(bytes(data[offset:offset + 4]), Mp3Format(version, sample_rate, mono), bitrate_index, length)
+
+
+def _skip_tags(data: bytes) -> tuple:
+    """Return the (start, end) byte range of audio frames, excluding ID3v2 and ID3v1 tags."""
+    start, end = 0, len(data)
+    if data[:3] == b"ID3" and len(data) >= 10:
+        size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+        footer = 10 if data[5] & 0x10 else 0
+        start = 10 + size + footer
+    if end - start >= 128 and data[end - 128:end - 125] == b"TAG":
+        end -= 128
+    return start, end
+
+
+def _is_info_frame(frame: bytes, header: FrameHeader) -> bool:
+    # Xing/Info/VBRI frames carry no audio, only the stream length of their own file
+    side_info = (17 if header.format.mono else 32) if header.format.version == 3 else (9 if header.format.mono else 17)
+    tag_offset = 4 + side_info
+    return frame[tag_offset:tag_offset + 4] in (b"Xing", b"Info") or frame[36:40] == b"VBRI"
+
+
+def iter_frames(data: bytes) -> Iterator[tuple]:
+    """
+    Yield (header, frame bytes) for every audio frame of an MP3 file.
+
+    Tags and a leading Xing/Info/VBRI frame are skipped.
+    """
+    offset, end = _skip_tags(data)
+    first = True
+    while offset + 4 <= end:
+        header = parse_header(data, offset)
+        if offset + header.length > end:
+            # A truncated last frame cannot be decoded; drop it
+            break
+        frame = data[offset:offset + header.length]
+        if not (first and _is_info_frame(frame, header)):
+            yield header, frame
+        first = False
+        offset += header.length
+
+
+def silence_frames(header: FrameHeader, duration_ms: int) -> bytes:
+    """
+    Encode silence as frames shaped like `header`.
+
+    A Layer III frame whose side information and main data are all zero
+    decodes to silence, so no encoder is needed. The padding and CRC bits of
+    the template header are cleared.
+    """
+    b1, b2, b3, b4 = header.raw
+    raw = bytes([b1, b2 | 0x01, b3 & ~0x02 & 0xFF, b4])
+    silent = parse_header(raw)
+    frame = raw + bytes(silent.length - 4)
+    n_frames = math.ceil(duration_ms / 1000 * silent.format.sample_rate / silent.format.samples_per_frame)
+    return frame * n_frames
+
+
+def concat_mp3(audio_files: List[str], output: BinaryIO, pause_ms: int = 500) -> Mp3Format:
+    """
+    Append the frames of MP3 files to `output`, each followed by a pause.
+
+    Files are read one at a time, so memory use is bounded by the largest file.
+
+    Args:
+        audio_files: Paths of Layer III MP3 files with the same format
+        output: Binary stream to write to
+        pause_ms: Silence after each file, in milliseconds
+
+    Returns:
+        Mp3Format: Format of the written stream
+
+    Raises:
+        Mp3FormatError: If a file cannot be parsed or its format differs from the first file's
+    """
+    stream_format = None
+    pause = b""
+    for audio_file in audio_files:
+        frames = iter_frames(Path(audio_file).read_bytes())
+        for header, frame in frames:
+            if stream_format is None:
+                stream_format = header.format
+                pause = silence_frames(header, pause_ms) if pause_ms else b""
+            elif header.format != stream_format:
+                raise Mp3FormatError(f"{audio_file} has format {header.format}, expected {stream_format}")
+            output.write(frame)
+        output.write(pause)
+    if stream_format is None:
+        raise Mp3FormatError("No MP3 frames found")
+    return stream_format
+
+
+def check_formats(audio_files: List[str]) -> Mp3Format:
+    """
+    Return the common format of MP3 files, checking only each file's first frame.
+
+    Raises:
+        Mp3FormatError: If a file cannot be parsed or the formats differ
+    """
+    formats = set()
+    for audio_file in audio_files:
+        with open(audio_file, "rb") as f:
+            head = f.read(64 * 1024)
+        start, _ = _skip_tags(head)
+        if start + 4 > len(head):
+            # A large ID3 tag; parse the whole file
+            head = Path(audio_file).read_bytes()
+        header, _ = next(iter_frames(head), (None, None))
+        if header is None:
+            raise Mp3FormatError(f"No MP3 frames found in {audio_file}")
+        formats.add(header.format)
+    if len(formats) != 1:
+        raise Mp3FormatError(f"Segments have different formats: {sorted(formats)}")
+    return formats.pop()
@@ -1,6 +1,5 @@
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 from pathlib import Path
-from langchain_google_vertexai import ChatVertexAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema import StrOutputParser
@@ -9,8 +8,13 @@ from pydantic import BaseModel, Field
 from typing import List, Literal
 from datetime import datetime
 import json
+import logging
 import random
+import re
 from src.utils.utils import read_source_files
+from src.utils.registry import get_chat_llm
+
+logger = logging.getLogger(__name__)
 
 SYSTEM_PROMPT_PODCAST_SCRIPT = """
 You are an expert podcast scriptwriter specializing in turning complex information into engaging audio content. Your task is to generate a compelling podcast script based on the provided documents, tailored to the specified audience, number of participants, and duration.
@@ -166,15 +170,16 @@ class PodcastScript(BaseModel):
     script: List[SpeakerScript] = Field(description="A list of speaker scripts forming the complete podcast script.")
 
 
-def create_podcast_script_chain():
-    """Create a LangChain LCEL chain for generating podcast scripts."""
+def create_podcast_script_chain(parse: bool = True):
+    """
+    Create a LangChain LCEL chain for generating podcast scripts.
     
-    # Initialize the Gemini model
-    llm = ChatVertexAI(
-        model_name="gemini-1.5-flash-002",
-        max_output_tokens=8096,
-        temperature=0.7,
-    )
+    Args:
+        parse: Parse the output into a PodcastScript; otherwise the chain returns the raw text
+    """
+    
+    # Shared Gemini client from the process-wide registry
+    llm = get_chat_llm(max_output_tokens=8096, temperature=0.7)
     
     # Create the podcast script generation prompt
     prompt = ChatPromptTemplate.from_messages([
@@ -188,7 +193,8 @@ def create_podcast_script_chain():
     ])
     
     # Build the LCEL chain
-    chain = prompt | llm | PydanticOutputParser(pydantic_object=PodcastScript)
+    parser = PydanticOutputParser(pydantic_object=PodcastScript) if parse else StrOutputParser()
+    chain = prompt | llm | parser
     
     return chain
 
@@ -210,21 +216,29 @@ def generate_podcast_script(
     target_audience: str, 
     duration_mins: int = 20, 
     timestamp: str = datetime.now().strftime("%Y%m%d_%H%M%S"), 
-    scripts_dir: Path = Path(".cache/generated_podcasts/scripts")
-) -> str:
+    scripts_dir: Path = Path(".cache/generated_podcasts/scripts"),
+    source_content: str | None = None
+) -> Tuple[PodcastScript, str]:
     """
     Generate a podcast script from the source documents.
     
+    Args:
+        source_content: Already read source content; read from the notebook if None
+    
     Returns:
-        str: Generated podcast script
+        Tuple[PodcastScript, str]: Generated podcast script and the path it was saved to
+        
+    Raises:
+        ValueError: If the number of participants is out of range or there are no sources
     """
     if n_participants < 1 or n_participants > 3:
         raise ValueError("Number of participants must be between 1 and 3.")
 
     # Read source documents
-    source_content = read_source_files()
+    if source_content is None:
+        source_content = read_source_files()
     if not source_content:
-        return "No source documents found. Please add some documents first."
+        raise ValueError("No source documents found. Please add some documents first.")
         
     # Create and run the chain
     chain = create_podcast_script_chain()
@@ -235,8 +249,136 @@ def generate_podcast_script(
         "duration": duration_mins
     })
 
+    scripts_dir = Path(scripts_dir)
+    scripts_dir.mkdir(parents=True, exist_ok=True)
     script_file = scripts_dir / f"podcast_script_{timestamp}.json"
     with open(script_file, "w") as f:
         json.dump(script.dict(), f, indent=2)
     
     return script, str(script_file)
+
+
+class ScriptStreamParser:
+    """
+    Incremental parser for the streamed podcast script JSON.
+    
+    Text is fed as it arrives; each object of the "script" array is returned
+    as soon as its closing brace is seen, without waiting for the rest of the
+    document. Anything around the JSON, such as Markdown code fences, is ignored.
+    """
+    
+    _ARRAY_START = re.compile(r'"script"\s*:\s*\[')
+    
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+    
+    def feed(self, text: str) -> List[SpeakerScript]:
+        """
+        Add streamed text.
+        
+        Returns:
+            List[SpeakerScript]: Script segments completed by this text
+        """
+        self.buffer += text
+        segments = []
+        if not self._in_array:
+            match = self._ARRAY_START.search(self.buffer, self._pos)
+            if match is None:
+                return segments
+            self._in_array = True
+            self._pos = match.end()
+        
+        buffer = self.buffer
+        i = self._pos
+        while i < len(buffer) and not self._done:
+            char = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._object_start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # End of the script array
+                    self._done = True
+                else:
+                    self._depth -= 1
+                    if self._depth == 0 and char == "}":
+                        segment = self._parse(buffer[self._object_start:i + 1])
+                        if segment is not None:
+                            segments.append(segment)
+                        self._object_start = None
+            i += 1
+        self._pos = i
+        return segments
+    
+    @staticmethod
+    def _parse(text: str) -> Optional[SpeakerScript]:
+        try:
+            return SpeakerScript(**json.loads(text))
+        except Exception as e:
+            logger.warning(f"Skipping malformed script segment: {str(e)}")
+            return None
+
+def stream_podcast_script(
+    n_participants: int, 
+    target_audience: str, 
+    duration_mins: int = 20, 
+    timestamp: str | None = None, 
+    scripts_dir: Path = Path(".cache/generated_podcasts/scripts"),
+    source_content: str | None = None
+) -> Iterator[SpeakerScript]:
+    """
+    Generate a podcast script, yielding each segment as soon as the model has written it.
+    
+    The full script is saved once the response is complete, as generate_podcast_script does.
+    
+    Yields:
+        SpeakerScript: Script segments in order
+    """
+    if n_participants < 1 or n_participants > 3:
+        raise ValueError("Number of participants must be between 1 and 3.")
+    timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Read source documents
+    if source_content is None:
+        source_content = read_source_files()
+    if not source_content:
+        raise ValueError("No source documents found. Please add some documents first.")
+    
+    chain = create_podcast_script_chain(parse=False)
+    parser = ScriptStreamParser()
+    segments = []
+    for chunk in chain.stream({
+        "source_content": source_content,
+        "number_of_participants": n_participants,
+        "target_audience": target_audience,
+        "duration": duration_mins
+    }):
+        for segment in parser.feed(chunk):
+            segments.append(segment)
+            yield segment
+    
+    if not segments:
+        raise ValueError("The podcast script could not be parsed.")
+    
+    scripts_dir = Path(scripts_dir)
+    scripts_dir.mkdir(parents=True, exist_ok=True)
+    script_file = scripts_dir / f"podcast_script_{timestamp}.json"
+    with open(script_file, "w") as f:
+        json.dump(PodcastScript(script=segments).dict(), f, indent=2)
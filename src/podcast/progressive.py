@@ -0,0 +1,155 @@
+"""
+Progressive podcast output.
+
+Segments are appended to the podcast as soon as they and every segment
+before them are synthesized. The output is written three ways:
+
+* an append-only MP3 stream, which becomes the finished podcast,
+* part files of a few segments each, small enough to hand to a player
+  while later segments are still being synthesized,
+* an HLS-style m3u8 playlist of the parts, closed with #EXT-X-ENDLIST
+  once the podcast is complete.
+"""
+from pathlib import Path
+from typing import List, NamedTuple
+import io
+import logging
+import math
+import os
+
+from src.podcast.mp3_concat import Mp3FormatError, concat_mp3, iter_frames
+
+logger = logging.getLogger(__name__)
+
+# Segments in the first part, kept small so playback can start early
+FIRST_PART_SEGMENTS = 2
+# Segments in each later part
+PART_SEGMENTS = 6
+
+
+class PodcastPart(NamedTuple):
+    """A playable piece of a podcast that is still being generated."""
+    path: str
+    index: int
+    duration: float
+    segments_done: int
+
+
+class ProgressivePodcastWriter:
+    """
+    Append synthesized segments to a growing podcast in script order.
+
+    Segments may be added in any order; each is written once all earlier
+    segments are in. If segments turn out not to share one MP3 format, the
+    writer stops producing output and `failed` is set, so the caller can
+    combine the segments another way.
+    """
+
+    def __init__(
+        self,
+        audio_dir: Path,
+        name: str,
+        pause_ms: int = 500,
+        first_part_segments: int = FIRST_PART_SEGMENTS,
+        part_segments: int = PART_SEGMENTS
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            audio_dir: Directory for the stream, parts and playlist
+            name: Base name of the outputs, e.g. podcast_20250101_120000
+            pause_ms: Pause after each segment, in milliseconds
+            first_part_segments: Segments in the first part
+            part_segments: Segments in each later part
+        """
+        self.stream_path = Path(audio_dir) / f"{name}.mp3"
+        self.parts_dir = Path(audio_dir) / f"{name}_parts"
+        self.playlist_path = self.parts_dir / "playlist.m3u8"
+        self.parts_dir.mkdir(parents=True, exist_ok=True)
+        self.stream_path.write_bytes(b"")
+        self.pause_ms = pause_ms
+        self.first_part_segments = max(1, first_part_segments)
+        self.part_segments = max(1, part_segments)
+
+        self.parts: List[PodcastPart] = []
+        self.failed = False
+        self._stream_format = None
+        self._ready = {}
+        self._next_index = 0
+        self._group = []
+
+    def add(self, index: int, audio_file: str) -> List[PodcastPart]:
+        """
+        Add a synthesized segment.
+
+        Args:
+            index: Position of the segment in the script
+            audio_file: Path of the segment's MP3 file
+
+        Returns:
+            List[PodcastPart]: Parts completed by this segment, usually none or one
+        """
+        self._ready[index] = audio_file
+        new_parts = []
+        while self._next_index in self._ready:
+            self._group.append(self._ready.pop(self._next_index))
+            self._next_index += 1
+            part_size = self.part_segments if self.parts else self.first_part_segments
+            if len(self._group) >= part_size:
+                new_parts.extend(self._flush())
+        return new_parts
+
+    def finish(self) -> List[PodcastPart]:
+        """Write the remaining segments and close the playlist."""
+        new_parts = self._flush()
+        if not self.failed:
+            self._write_playlist(complete=True)
+        return new_parts
+
+    def _flush(self) -> List[PodcastPart]:
+        group, self._group = self._group, []
+        if not group or self.failed:
+            return []
+        buffer = io.BytesIO()
+        try:
+            stream_format = concat_mp3(group, buffer, pause_ms=self.pause_ms)
+            if self._stream_format is not None and stream_format != self._stream_format:
+                raise Mp3FormatError(f"Part has format {stream_format}, expected {self._stream_format}")
+        except Mp3FormatError as e:
+            logger.info(f"Stopping progressive podcast output: {str(e)}")
+            self.failed = True
+            return []
+        self._stream_format = stream_format
+
+        data = buffer.getvalue()
+        n_frames = sum(1 for _ in iter_frames(data))
+        duration = n_frames * stream_format.samples_per_frame / stream_format.sample_rate
+
+        part_path = self.parts_dir / f"part_{len(self.parts):04d}.mp3"
+        part_path.write_bytes(data)
+        with open(self.stream_path, "ab") as stream:
+            stream.write(data)
+        part = PodcastPart(str(part_path), len(self.parts), duration, self._next_index)
+        self.parts.append(part)
+        self._write_playlist(complete=False)
+        return [part]
+
+    def _write_playlist(self, complete: bool):
+        target = math.ceil(max((part.duration for part in self.parts), default=0.0))
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{target}", "#EXT-X-MEDIA-SEQUENCE:0"]
+        lines.append("#EXT-X-PLAYLIST-TYPE:VOD" if complete else "#EXT-X-PLAYLIST-TYPE:EVENT")
+        for part in self.parts:
+            lines.append(f"#EXTINF:{part.duration:.3f},")
+            lines.append(Path(part.path).name)
+        if complete:
+            lines.append("#EXT-X-ENDLIST")
+        # Replace atomically so players polling the playlist never read a partial file
+        tmp_path = self.playlist_path.with_suffix(".tmp")
+        tmp_path.write_text("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.playlist_path)
+
+    @property
+    def duration(self) -> float:
+        """Seconds of audio written so far."""
+        return sum(part.duration for part in self.parts)
@@ -0,0 +1,122 @@
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SegmentCache:
+    """
+    Content-addressed disk cache of synthesized speech segments.
+
+    Audio is stored as `<key>.mp3` under `cache_dir`, where the key hashes
+    everything that determines the audio: text, voice, language and audio
+    config. A SQLite index tracks sizes and access times; once the cache
+    exceeds `max_bytes`, the least recently used segments are deleted.
+    """
+
+    def __init__(self, cache_dir: str = ".cache/tts_segments", max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the audio files and index
+            max_bytes: Disk budget for cached audio
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_dir / "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "key TEXT PRIMARY KEY, size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_segments_last_access ON segments(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, voice_name: str, language_code: str, audio_config: dict) -> str:
+        """Hash the inputs that determine a segment's audio."""
+        payload = json.dumps(
+            {"text": text, "voice": voice_name, "language": language_code, "audio_config": audio_config},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.mp3"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached audio of a segment, or None on a miss."""
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self.bytes_served += len(audio)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments (key, size, last_access) VALUES (?, ?, ?)",
+                (key, len(audio), time.time())
+            )
+            self._conn.commit()
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        """Store a segment's audio and evict the least recently used segments beyond the budget."""
+        path = self._path(key)
+        # Write under a temporary name so concurrent readers never see a partial file
+        tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(audio)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments (key, size, last_access) VALUES (?, ?, ?)",
+                (key, len(audio), time.time())
+            )
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM segments").fetchone()[0]
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, size in self._conn.execute("SELECT key, size FROM segments ORDER BY last_access").fetchall():
+                    if total <= self.max_bytes * 0.9 or old_key == key:
+                        break
+                    self._path(old_key).unlink(missing_ok=True)
+                    self._conn.execute("DELETE FROM segments WHERE key = ?", (old_key,))
+                    total -= size
+                    evicted += 1
+                logger.info(f"Evicted {evicted} segments from TTS cache")
+            self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counts and the size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM segments").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "bytes_served": self.bytes_served,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        """Close the SQLite index."""
+        with self._lock:
+            self._conn.close()
@@ -1,22 +1,84 @@
 import os
 import json
+import logging
+import random
+import shutil
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from google.api_core import exceptions as google_exceptions
 from google.cloud import texttospeech
 from pydub import AudioSegment
 from datetime import datetime
 
-from src.podcast.podcast_script import generate_podcast_script
+from src.podcast.podcast_script import stream_podcast_script
+from src.utils.registry import get_tts_client, get_tts_segment_cache
+from src.podcast.segment_cache import SegmentCache
+from src.podcast.mp3_concat import Mp3FormatError, check_formats, concat_mp3
+from src.podcast.progressive import PodcastPart, ProgressivePodcastWriter
+
+logger = logging.getLogger(__name__)
+
+# Quota and transient server errors worth retrying
+RETRYABLE_ERRORS = (
+    google_exceptions.ResourceExhausted,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+)
+
+TTS_CONCURRENCY = int(os.getenv("NOTEBOOKLM_TTS_CONCURRENCY", "4"))
+# Cloud Text-to-Speech allows 1000 requests per minute per project. Each voice
+# is limited separately, so a podcast with three voices stays under the quota.
+TTS_REQUESTS_PER_MINUTE_PER_VOICE = float(os.getenv("NOTEBOOKLM_TTS_RPM_PER_VOICE", "300"))
+LANGUAGE_CODE = "en-US"
+
+class RateLimiter:
+    """Spaces calls evenly so that at most `requests_per_minute` start per minute."""
+    
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._next = 0.0
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the next call may start."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
 
 class PodcastSpeechSynthesizer:
-    def __init__(self, output_dir: str = ".cache/generated_podcasts"):
+    def __init__(
+        self,
+        output_dir: str = ".cache/generated_podcasts",
+        max_concurrency: int = TTS_CONCURRENCY,
+        requests_per_minute_per_voice: float = TTS_REQUESTS_PER_MINUTE_PER_VOICE,
+        max_retries: int = 5
+    ):
         """
         Initialize the podcast speech synthesizer.
         
         Args:
             output_dir: Directory to save generated audio files
+            max_concurrency: Maximum TTS requests in flight
+            requests_per_minute_per_voice: Request rate limit applied to each voice.
+                Throughput is capped at about voices x this rate, and by max_concurrency.
+            max_retries: Attempts per segment on quota and transient errors
         """
-        self.client = texttospeech.TextToSpeechClient()
+        self.client = get_tts_client()
+        self.segment_cache = get_tts_segment_cache()
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_per_minute_per_voice = requests_per_minute_per_voice
+        self.max_retries = max_retries
+        self._limiters = {}
+        self._limiters_lock = threading.Lock()
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
@@ -30,6 +92,9 @@ class PodcastSpeechSynthesizer:
         """
         Synthesize speech for a single piece of text.
         
+        Segments already synthesized with the same text, voice and audio settings
+        are served from the segment cache without calling the TTS API.
+        
         Args:
             text: Text to synthesize
             voice_name: Name of the voice to use
@@ -43,7 +108,7 @@ class PodcastSpeechSynthesizer:
 
         # Build the voice request
         voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
+            language_code=LANGUAGE_CODE,
             name=voice_name
         )
 
@@ -54,42 +119,148 @@ class PodcastSpeechSynthesizer:
             pitch=0.0
         )
 
-        # Perform the text-to-speech request
-        response = self.client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
-        )
+        # Perform the text-to-speech request unless the segment is cached
+        key = SegmentCache.make_key(text, voice_name, LANGUAGE_CODE, texttospeech.AudioConfig.to_dict(audio_config))
+        audio_content = self.segment_cache.get(key)
+        if audio_content is None:
+            response = self._request(voice_name, synthesis_input, voice, audio_config)
+            audio_content = response.audio_content
+            self.segment_cache.put(key, audio_content)
 
         # Write the response to the output file
         output_path = self.audio_dir / output_file
         with open(output_path, "wb") as out:
-            out.write(response.audio_content)
+            out.write(audio_content)
             
         return str(output_path)
 
-    def combine_audio_files(self, audio_files: List[str], output_file: str) -> str:
+    def _limiter(self, voice_name: str) -> RateLimiter:
+        with self._limiters_lock:
+            if voice_name not in self._limiters:
+                self._limiters[voice_name] = RateLimiter(self.requests_per_minute_per_voice)
+            return self._limiters[voice_name]
+
+    def _request(self, voice_name: str, synthesis_input, voice, audio_config):
+        """Call the TTS API under the voice's rate limit, retrying with jittered exponential backoff."""
+        for attempt in range(self.max_retries):
+            self._limiter(voice_name).acquire()
+            try:
+                return self.client.synthesize_speech(
+                    input=synthesis_input,
+                    voice=voice,
+                    audio_config=audio_config
+                )
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"TTS error for voice {voice_name} ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def iter_segments(self, segments: Iterable[Tuple[str, str, str]]) -> Iterator[Tuple[int, str]]:
+        """
+        Synthesize segments concurrently, yielding each as soon as it and all earlier segments are done.
+        
+        Args:
+            segments: (text, voice name, output file) per segment, in script order
+            
+        Yields:
+            Tuple[int, str]: Index of the segment and path of its audio file, in script order
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="tts")
+        try:
+            # Repeated lines are synthesized once, so concurrent requests never race on the same segment
+            futures = {}
+            pending = deque()
+            for i, (text, voice_name, output_file) in enumerate(segments):
+                duplicate = (text, voice_name) in futures
+                if not duplicate:
+                    futures[(text, voice_name)] = executor.submit(self.synthesize_speech, text, voice_name, output_file)
+                pending.append((i, futures[(text, voice_name)], output_file, duplicate))
+                while pending and pending[0][1].done():
+                    yield self._resolve(*pending.popleft())
+            while pending:
+                yield self._resolve(*pending.popleft())
+        except BaseException:
+            # A failed segment, script or consumer ends the podcast: drop queued requests
+            # rather than waiting for (and paying for) them
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        executor.shutdown()
+    
+    def _resolve(self, index: int, future, output_file: str, duplicate: bool) -> Tuple[int, str]:
+        audio_file = future.result()
+        if duplicate:
+            output_path = self.audio_dir / output_file
+            shutil.copyfile(audio_file, output_path)
+            audio_file = str(output_path)
+        return index, audio_file
+
+    def synthesize_segments(self, segments: Iterable[Tuple[str, str, str]]) -> List[str]:
+        """
+        Synthesize several segments concurrently.
+        
+        Args:
+            segments: (text, voice name, output file) per segment, in script order; may be a
+                generator still producing segments, which are synthesized as they arrive
+            
+        Returns:
+            List[str]: Paths to the generated audio files, in the order of `segments`
+        """
+        started = time.perf_counter()
+        audio_files = [audio_file for _, audio_file in self.iter_segments(segments)]
+        logger.info(
+            f"Synthesized {len(audio_files)} segments in {time.perf_counter() - started:.1f}s "
+            f"with up to {self.max_concurrency} concurrent requests; segment cache: {self.segment_cache.get_stats()}"
+        )
+        return audio_files
+
+    def combine_audio_files(self, audio_files: List[str], output_file: str, pause_ms: int = 500) -> str:
         """
         Combine multiple audio files into a single podcast.
         
+        MP3 frames are appended straight to the output file with pre-encoded
+        silence frames between segments, so nothing is decoded or re-encoded and
+        memory use does not grow with the episode length. Segments whose formats
+        differ fall back to decoding and re-encoding with pydub.
+        
         Args:
             audio_files: List of paths to audio files
             output_file: Name of the output file
+            pause_ms: Pause after each segment, in milliseconds
             
         Returns:
             str: Path to the combined audio file
         """
-        combined = AudioSegment.empty()
+        output_path = self.audio_dir / output_file
+        tmp_path = output_path.with_suffix(".part")
+        try:
+            check_formats(audio_files)
+            with open(tmp_path, "wb") as out:
+                concat_mp3(audio_files, out, pause_ms=pause_ms)
+        except Mp3FormatError as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.info(f"Re-encoding podcast audio: {str(e)}")
+            return self._combine_with_pydub(audio_files, output_path, pause_ms)
+        os.replace(tmp_path, output_path)
+        
+        return str(output_path)
+
+    def _combine_with_pydub(self, audio_files: List[str], output_path: Path, pause_ms: int) -> str:
+        """Decode, join and re-encode segments, converting them to the first segment's format."""
+        segments = [AudioSegment.from_file(audio_file) for audio_file in audio_files]
+        first = segments[0]
+        pause = AudioSegment.silent(duration=pause_ms, frame_rate=first.frame_rate)
         
-        # Add small pause between segments
-        pause = AudioSegment.silent(duration=500)  # 500ms pause
+        # Join raw PCM once instead of repeated AudioSegment concatenation
+        raw = []
+        for segment in segments:
+            for part in (segment, pause):
+                part = part.set_frame_rate(first.frame_rate).set_channels(first.channels).set_sample_width(first.sample_width)
+                raw.append(part.raw_data)
+        combined = first._spawn(b"".join(raw))
         
-        for audio_file in audio_files:
-            segment = AudioSegment.from_mp3(audio_file)
-            combined += segment + pause
-            
         # Save the combined audio
-        output_path = self.audio_dir / output_file
         combined.export(output_path, format="mp3")
         
         return str(output_path)
@@ -98,56 +269,74 @@ def create_podcast_audio(
     n_participants: int,
     target_audience: str,
     duration_mins: int = 20,
-    output_filename: str = "podcast.mp3"
-) -> tuple[str, str]:
+    output_filename: str = "podcast.mp3",
+    on_part: Optional[Callable[[PodcastPart], None]] = None
+) -> str:
     """
     Generate a complete podcast audio file from source documents.
     
+    With `on_part`, the podcast is written progressively: segments are appended
+    to the output as they finish and playable parts are reported while later
+    segments are still being synthesized.
+    
     Args:
         n_participants: Number of participants (1-3)
         target_audience: Target audience type
         duration_mins: Duration in minutes
         output_filename: Name of the output audio file
+        on_part: Called on the calling thread with each part as it is written
         
     Returns:
-        tuple[str, str]: Paths to the generated script file and podcast audio file
+        str: Path to the podcast audio file
     """
     # Generate timestamp for file naming
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    started = time.perf_counter()
     
     # Initialize speech synthesizer
     synthesizer = PodcastSpeechSynthesizer()
 
-    # Generate the podcast script
-    script, _ = generate_podcast_script(
+    # Stream the podcast script so each segment is synthesized as soon as the model has written it
+    script = stream_podcast_script(
         n_participants=n_participants,
         target_audience=target_audience,
         duration_mins=duration_mins,
         timestamp=timestamp,
         scripts_dir=synthesizer.scripts_dir
     )
-    
-    # Generate audio for each script segment
-    audio_files = []
-    for i, segment in enumerate(script.script):
-        # Generate unique filename for this segment
-        segment_filename = f"segment_{timestamp}_{i}_{segment.speaker.speaker_name}.mp3"
-        
-        # Synthesize speech for this segment
-        audio_file = synthesizer.synthesize_speech(
-            text=segment.speaker_script,
-            voice_name=segment.speaker.speaker_voice,
-            output_file=segment_filename
+    segments = (
+        (
+            segment.speaker_script,
+            segment.speaker.speaker_voice,
+            f"segment_{timestamp}_{i}_{segment.speaker.speaker_name}.mp3"
         )
-        audio_files.append(audio_file)
+        for i, segment in enumerate(script)
+    )
     
     # Add timestamp to final output filename
     output_filename = f"podcast_{timestamp}.mp3"
     
+    if on_part is None:
+        # Generate audio for all script segments concurrently, kept in script order
+        audio_files = synthesizer.synthesize_segments(segments)
+    else:
+        writer = ProgressivePodcastWriter(synthesizer.audio_dir, f"podcast_{timestamp}")
+        audio_files = []
+        for i, audio_file in synthesizer.iter_segments(segments):
+            audio_files.append(audio_file)
+            for part in writer.add(i, audio_file):
+                if part.index == 0:
+                    logger.info(f"First podcast audio ready after {time.perf_counter() - started:.1f}s")
+                on_part(part)
+        for part in writer.finish():
+            on_part(part)
+        if not writer.failed:
+            return str(writer.stream_path)
+    
     # Combine all audio segments into final podcast
     final_audio = synthesizer.combine_audio_files(
         audio_files=audio_files,
         output_file=output_filename
     )
     
-    return final_audio
\ No newline at end of file
+    return final_audio
@@ -1,26 +1,110 @@
 from pathlib import Path
-import pypdf
 from docx import Document
 import datetime
 import mimetypes
 import logging
-from .vectordb_ingestion import VectorDBIngestion
+import re
+from typing import Optional, Tuple, List, Iterable, Iterator
+from .vectordb_ingestion import iter_text_blocks, iter_stream_blocks
+from .parse_store import ParseStore, hash_file
+from .pdf_extract import iter_pdf_pages
+from src.utils.registry import VECTOR_BACKEND, get_ingestion, hold_collection
+
+# A parsed section of a document: (1-based page number or None, text)
+Section = Tuple[Optional[int], str]
+
+# Line preceding each page of a paged document in the parsed markdown
+PAGE_MARKER = "<!-- page {} -->"
+_PAGE_MARKER_RE = re.compile(r"<!-- page (\d+) -->\n?")
+
+
+def iter_markdown_sections(markdown_path: str, block_chars: int = 65536) -> Iterator[Section]:
+    """
+    Read the sections of a parsed markdown file back, without its metadata header.
+    
+    Pages of paged documents are recovered from their page markers, with the
+    page numbers they were parsed with; other documents are read in the same
+    consecutive blocks as iter_text_blocks.
+    
+    Args:
+        markdown_path: Markdown file written by DocumentParser
+        block_chars: Approximate number of characters per block of pageless text
+        
+    Yields:
+        Section: (page number or None, text) in document order
+    """
+    with open(markdown_path, "r") as f:
+        line = f.readline()
+        if line.startswith("# Parsed Document:"):
+            # The header ends with a "---" line and a blank line
+            while line and line != "---\n":
+                line = f.readline()
+            f.readline()
+            line = f.readline()
+        
+        match = _PAGE_MARKER_RE.fullmatch(line)
+        if match is None:
+            for block in iter_stream_blocks(f, block_chars, buffer=line):
+                yield None, block
+            return
+        
+        page, lines = int(match.group(1)), []
+        for line in f:
+            next_match = _PAGE_MARKER_RE.fullmatch(line)
+            if next_match is None:
+                lines.append(line)
+                continue
+            # Drop the blank line separating the page from the next marker
+            yield page, "".join(lines)[:-2]
+            page, lines = int(next_match.group(1)), []
+        yield page, "".join(lines)
 
 class DocumentParser:
     """Parser for various document formats (txt, md, pdf, docx)."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        collection_name: str = "document_chunks",
+        pdf_workers: Optional[int] = None,
+        pdf_pages_per_task: int = 16
+    ):
+        """
+        Initialize the parser.
+        
+        Args:
+            collection_name: Vector store collection of the notebook parsed files are indexed into
+            pdf_workers: Worker processes for page-parallel PDF extraction.
+                None uses the CPU count; 1 extracts serially
+            pdf_pages_per_task: Number of PDF pages each worker extracts per task
+        """
+        self.pdf_workers = pdf_workers
+        self.pdf_pages_per_task = pdf_pages_per_task
         self.cache_dir = Path(".cache/parsed_docs")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
-        self.vectordb = VectorDBIngestion()
+        self.collection_name = collection_name
+        self.store = ParseStore(self.cache_dir / "index.json")
+        # Indexing is recorded per backend, so switching NOTEBOOKLM_VECTOR_BACKEND re-indexes on upload
+        self.index_key = f"{VECTOR_BACKEND}:{collection_name}"
+    
+    @property
+    def vectordb(self):
+        """The collection's ingestion, looked up on each use inside `hold_collection`, since idle collections are evicted from the registry."""
+        return get_ingestion(self.collection_name)
         
-    def parse_file(self, file_path: str) -> str:
+    def parse_file(self, file_path: str, content_hash: Optional[str] = None) -> str:
         """
         Parse a file and return path to the markdown output file.
         Supported formats: txt, md, pdf, docx
         
+        Files are content-addressed: if the same bytes were parsed before, the
+        existing markdown file is returned and nothing is parsed or embedded again.
+        Content already in this notebook under another filename is not indexed a
+        second time; its markdown path is returned as is.
+        
         Args:
             file_path: Path to the input file
+            content_hash: SHA-256 of the raw file bytes, if already computed
+                (e.g. while streaming the upload to disk)
             
         Returns:
             str: Path to the output markdown file
@@ -28,6 +112,32 @@ class DocumentParser:
         file_path = Path(file_path)
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
+        
+        content_hash = content_hash or hash_file(str(file_path))
+        collection_name = self.collection_name
+        record = self.store.get(content_hash)
+        if record is not None:
+            markdown_path = record["markdown_path"]
+            indexed = record["indexed"].get(self.index_key)
+            if indexed is not None:
+                if indexed["source_id"] != file_path.name:
+                    # Indexing the same content again under another name would only duplicate its chunks
+                    logging.info(f"{file_path.name} has the same content as {indexed['source_id']} in {collection_name}")
+                else:
+                    logging.info(f"Parse store hit for {file_path.name}: {markdown_path}")
+                return markdown_path
+            
+            # Parsed for another notebook: index the stored sections here, keeping their page
+            # numbers, with vectors served from the embedding cache
+            logging.info(f"Parse store hit for {file_path.name}, indexing into {collection_name}")
+            with hold_collection(self.collection_name):
+                chunk_ids = self.vectordb.process_pages(
+                    iter_markdown_sections(markdown_path),
+                    source=markdown_path,
+                    source_id=file_path.name
+                )
+            self.store.put(content_hash, markdown_path, self.index_key, file_path.name, chunk_ids)
+            return markdown_path
             
         # Detect file type
         mime_type, _ = mimetypes.guess_type(str(file_path))
@@ -36,17 +146,23 @@ class DocumentParser:
             
         # Parse based on file type
         try:
+            # Every format streams bounded sections into the ingestion pipeline
             if mime_type == "text/plain" or file_path.suffix in [".txt", ".md"]:
-                content = self._parse_text_file(file_path)
+                sections = ((None, block) for block in iter_text_blocks(str(file_path)))
             elif mime_type == "application/pdf":
-                content = self._parse_pdf(file_path)
+                # Pages stream in as they are extracted
+                sections = self._iter_pdf_pages(file_path)
             elif mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                content = self._parse_docx(file_path)
+                sections = self._iter_docx_sections(file_path)
             else:
                 raise ValueError(f"Unsupported file type: {file_path.suffix}")
                 
             # Save to markdown file
-            return self._save_to_markdown(content, file_path.name)
+            output_path, chunk_ids = self._save_to_markdown(sections, file_path.name, content_hash)
+            if chunk_ids:
+                # Only record fully indexed content so failed indexing is retried next time
+                self.store.put(content_hash, output_path, self.index_key, file_path.name, chunk_ids)
+            return output_path
             
         except Exception as e:
             logging.error(f"Error parsing file {file_path}: {str(e)}")
@@ -58,35 +174,83 @@ class DocumentParser:
     
     def _parse_pdf(self, file_path: Path) -> str:
         """Parse PDF files."""
-        content = []
-        with open(file_path, "rb") as file:
-            pdf = pypdf.PdfReader(file)
-            for page in pdf.pages:
-                content.append(page.extract_text())
-        return "\n\n".join(content)
+        return "\n\n".join(text for _, text in self._iter_pdf_pages(file_path))
+    
+    def _iter_pdf_pages(self, file_path: Path) -> Iterator[Section]:
+        """Yield (page_number, text) for each PDF page in order, extracted in parallel."""
+        return iter_pdf_pages(
+            str(file_path),
+            workers=self.pdf_workers,
+            pages_per_task=self.pdf_pages_per_task
+        )
     
     def _parse_docx(self, file_path: Path) -> str:
         """Parse DOCX files."""
+        return "\n\n".join(text for _, text in self._iter_docx_sections(file_path))
+    
+    def _iter_docx_sections(self, file_path: Path, block_chars: int = 65536) -> Iterator[Section]:
+        """
+        Yield DOCX paragraphs grouped into blocks of roughly block_chars characters.
+        
+        Paragraphs are separated by blank lines; each block after the first starts
+        with the separator, so the blocks concatenate to the document text.
+        """
         doc = Document(file_path)
         content = []
+        size = 0
+        separator = ""
         for paragraph in doc.paragraphs:
             if paragraph.text.strip():
                 content.append(paragraph.text)
-        return "\n\n".join(content)
+                size += len(paragraph.text)
+            if size >= block_chars:
+                yield None, separator + "\n\n".join(content)
+                content, size, separator = [], 0, "\n\n"
+        if content:
+            yield None, separator + "\n\n".join(content)
     
-    def _save_to_markdown(self, content: str, original_filename: str) -> str:
+    def remove_source(self, source_id: str) -> int:
+        """
+        Remove a source from this notebook's collection and the parse store.
+        
+        Args:
+            source_id: Identifier the source was indexed with (the original filename)
+            
+        Returns:
+            int: Number of chunks deleted
+        """
+        self.store.remove_source(self.index_key, source_id)
+        with hold_collection(self.collection_name):
+            return self.vectordb.delete_source(source_id)
+    
+    def lookup(self, content_hash: str) -> Optional[dict]:
+        """
+        Return the stored markdown path and chunk IDs for already-parsed content.
+        
+        Args:
+            content_hash: SHA-256 of the raw file bytes
+            
+        Returns:
+            Optional[dict]: Parse store record, or None on a miss
+        """
+        return self.store.get(content_hash)
+    
+    def _save_to_markdown(self, sections: Iterable[Section], original_filename: str, content_hash: str) -> Tuple[str, List[str]]:
         """
         Save content to a markdown file in the cache directory and index it.
         
+        Sections are written and indexed as they arrive, so chunking and embedding
+        of early PDF pages overlaps with extraction of later ones.
+        
         Args:
-            content: The content to save
+            sections: (page_number, text) sections of the document, in order
             original_filename: Name of the original file
+            content_hash: SHA-256 of the raw file bytes, used to name the output
             
         Returns:
-            str: Path to the saved markdown file
+            Tuple[str, List[str]]: Path to the saved markdown file and the indexed chunk IDs
         """
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_filename = f"parsed_{Path(original_filename).stem}_{timestamp}.md"
+        output_filename = f"parsed_{Path(original_filename).stem}_{content_hash[:16]}.md"
         output_path = self.cache_dir / output_filename
         
         # Add metadata header
@@ -94,17 +258,45 @@ class DocumentParser:
         header += f"Parsed at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M')}\n\n"
         header += "---\n\n"
         
-        full_content = header + content
-        output_path.write_text(full_content)
+        parse_errors = []
         
-        # Index the document in vector database
-        try:
-            self.vectordb.process_document(
-                str(output_path),
-                source_id=original_filename
-            )
-            logging.info(f"Indexed document in vector database: {original_filename}")
-        except Exception as e:
-            logging.error(f"Error indexing document {original_filename}: {str(e)}")
+        def written_sections(out) -> Iterator[Section]:
+            try:
+                for i, (page, text) in enumerate(sections):
+                    # Pageless blocks are consecutive slices of the document; pages are separated by
+                    # blank lines and marked so they can be read back with iter_markdown_sections
+                    if page is None:
+                        out.write(text)
+                    else:
+                        out.write(("\n\n" if i else "") + PAGE_MARKER.format(page) + "\n" + text)
+                    yield page, text
+            except Exception as e:
+                parse_errors.append(e)
+                raise
+        
+        chunk_ids = []
+        with open(output_path, "w") as out:
+            out.write(header)
+            written = written_sections(out)
+            
+            # Index the document in vector database
+            try:
+                with hold_collection(self.collection_name):
+                    chunk_ids = self.vectordb.process_pages(
+                        written,
+                        source=str(output_path),
+                        source_id=original_filename
+                    )
+                logging.info(f"Indexed document in vector database: {original_filename}")
+            except Exception as e:
+                if parse_errors:
+                    out.close()
+                    output_path.unlink(missing_ok=True)
+                    raise parse_errors[0]
+                logging.error(f"Error indexing document {original_filename}: {str(e)}")
+                chunk_ids = []
+                # Finish writing the markdown even though indexing failed
+                for _ in written:
+                    pass
         
-        return str(output_path)
\ No newline at end of file
+        return str(output_path), chunk_ids
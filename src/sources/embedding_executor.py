@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List
+import logging
+import random
+import threading
+import time
+
+from google.api_core import exceptions as google_exceptions
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+QUOTA_ERRORS = (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+
+
+class EmbeddingExecutor:
+    """
+    Run embedding requests concurrently with adaptive batch sizing.
+
+    Texts are grouped into requests bounded by both a chunk count and a total
+    character count, and up to `max_concurrency` requests are kept in flight on
+    a thread pool. The batch size grows additively while requests finish under
+    `target_latency` and shrinks multiplicatively when they are slow or hit
+    quota errors, which are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        max_concurrency: int = 4,
+        initial_batch_size: int = 32,
+        min_batch_size: int = 1,
+        max_batch_size: int = 250,
+        max_batch_chars: int = 60_000,
+        target_latency: float = 2.0,
+        max_retries: int = 6
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            embeddings: Embeddings implementation used for each request
+            max_concurrency: Maximum number of embedding requests in flight
+            initial_batch_size: Starting number of texts per request
+            min_batch_size: Lower bound for the adaptive batch size
+            max_batch_size: Upper bound for the adaptive batch size (API limit)
+            max_batch_chars: Maximum total characters per request
+            target_latency: Request latency in seconds above which the batch size shrinks
+            max_retries: Attempts per request before a quota error is raised
+        """
+        self.embeddings = embeddings
+        self.max_concurrency = max_concurrency
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.max_batch_chars = max_batch_chars
+        self.target_latency = target_latency
+        self.max_retries = max_retries
+        self.batch_size = initial_batch_size
+
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embed")
+
+    def _next_batch(self, texts: List[str], start: int) -> int:
+        """Return the end index of the next request starting at `start`."""
+        end = start
+        chars = 0
+        with self._lock:
+            batch_size = self.batch_size
+        while end < len(texts) and end - start < batch_size:
+            if end > start and chars + len(texts[end]) > self.max_batch_chars:
+                break
+            chars += len(texts[end])
+            end += 1
+        return end
+
+    def _adapt(self, latency: float, quota_error: bool = False):
+        with self._lock:
+            if quota_error or latency > self.target_latency:
+                self.batch_size = max(self.min_batch_size, int(self.batch_size * (0.5 if quota_error else 0.75)))
+            else:
+                self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 8))
+
+    def _embed_request(self, texts: List[str]) -> List[List[float]]:
+        """Embed one request, backing off and retrying on quota errors."""
+        for attempt in range(self.max_retries):
+            started = time.perf_counter()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                self._adapt(time.perf_counter() - started)
+                return vectors
+            except QUOTA_ERRORS as e:
+                self._adapt(time.perf_counter() - started, quota_error=True)
+                if attempt == self.max_retries - 1:
+                    raise
+                delay = min(30.0, 2 ** attempt) * (0.5 + random.random())
+                logger.warning(f"Embedding quota error ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts with up to `max_concurrency` requests in flight.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            List[List[float]]: One vector per text, in input order
+        """
+        if not texts:
+            return []
+        started = time.perf_counter()
+        results = [None] * len(texts)
+        pending = {}
+        position = 0
+
+        while position < len(texts) or pending:
+            # Keep the pool full; batches are sized with the latest adapted batch size
+            while position < len(texts) and len(pending) < self.max_concurrency:
+                end = self._next_batch(texts, position)
+                pending[self._pool.submit(self._embed_request, texts[position:end])] = (position, end)
+                position = end
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, end = pending.pop(future)
+                results[start:end] = future.result()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Embedded {len(texts)} chunks in {elapsed:.2f}s "
+            f"({len(texts) / max(elapsed, 1e-9):.1f} chunks/s, batch size {self.batch_size})"
+        )
+        return results
+
+    def get_stats(self) -> dict:
+        """Get the current executor configuration and adapted batch size."""
+        return {"batch_size": self.batch_size, "max_concurrency": self.max_concurrency}
+
+    def shutdown(self):
+        """Shut down the worker pool."""
+        self._pool.shutdown(wait=True)
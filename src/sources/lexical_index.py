@@ -0,0 +1,190 @@
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+
+from langchain.schema import Document
+
+logger = logging.getLogger(__name__)
+
+# Words, plus compound identifiers such as "ERR-4032", "v2.1.0" or "part_no/17"
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase lexical terms.
+
+    Compound identifiers are kept whole and also split into their parts, so
+    "ERR-4032" matches both "err-4032" and "4032".
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in re.split(r"[-./_]", token) if part)
+    return terms
+
+
+class BM25Index:
+    """
+    Incrementally updatable BM25 inverted index persisted in SQLite.
+
+    Maintained next to a vector store collection: chunks are added, updated and
+    deleted by chunk ID as sources are indexed, so exact identifiers, part
+    numbers and error codes can be found without an embedding round trip.
+    """
+
+    def __init__(self, index_path: str, k1: float = 1.5, b: float = 0.75):
+        """
+        Initialize the index.
+
+        Args:
+            index_path: Path of the SQLite file holding the index
+            k1: BM25 term frequency saturation parameter
+            b: BM25 document length normalization parameter
+        """
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_id TEXT PRIMARY KEY, source_id TEXT, length INTEGER NOT NULL, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, chunk_id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source_id)")
+        self._conn.commit()
+
+    def add(self, ids: List[str], texts: List[str], metadatas: List[dict]):
+        """Add or replace chunks in the index."""
+        with self._lock:
+            self._delete(ids)
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                counts = Counter(tokenize(text))
+                self._conn.execute(
+                    "INSERT INTO chunks (chunk_id, source_id, length, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                    (chunk_id, metadata.get("source_id"), sum(counts.values()), text, json.dumps(metadata))
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, chunk_id, tf) VALUES (?, ?, ?)",
+                    [(term, chunk_id, tf) for term, tf in counts.items()]
+                )
+            self._conn.commit()
+
+    def update_metadata(self, ids: List[str], metadatas: List[dict]):
+        """Replace the stored metadata of unchanged chunks."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET source_id = ?, metadata = ? WHERE chunk_id = ?",
+                [(metadata.get("source_id"), json.dumps(metadata), chunk_id) for chunk_id, metadata in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+
+    def missing(self, ids: List[str]) -> List[str]:
+        """Return the IDs that are not in the index, in the given order."""
+        present = set()
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                present.update(row[0] for row in self._conn.execute(
+                    f"SELECT chunk_id FROM chunks WHERE chunk_id IN ({placeholders})", batch
+                ).fetchall())
+        return [chunk_id for chunk_id in ids if chunk_id not in present]
+
+    def delete(self, ids: List[str]):
+        """Remove chunks from the index."""
+        with self._lock:
+            self._delete(ids)
+            self._conn.commit()
+
+    def _delete(self, ids: List[str]):
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+
+    def search(self, query: str, k: int = 4, source_ids: Optional[List[str]] = None) -> List[Tuple[Document, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: Search query
+            k: Number of results to return
+            source_ids: Restrict results to these sources; None searches everything
+
+        Returns:
+            List[Tuple[Document, float]]: Matching chunks and their BM25 scores, best first
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or source_ids == []:
+            return []
+
+        with self._lock:
+            n_chunks, avg_length = self._conn.execute("SELECT COUNT(*), AVG(length) FROM chunks").fetchone()
+            if not n_chunks:
+                return []
+            term_placeholders = ",".join("?" * len(terms))
+            doc_freqs = dict(self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE term IN ({term_placeholders}) GROUP BY term", terms
+            ).fetchall())
+
+            sql = (
+                "SELECT p.chunk_id, p.term, p.tf, c.length FROM postings p JOIN chunks c ON c.chunk_id = p.chunk_id "
+                f"WHERE p.term IN ({term_placeholders})"
+            )
+            params = list(terms)
+            if source_ids is not None:
+                sql += f" AND c.source_id IN ({','.join('?' * len(source_ids))})"
+                params.extend(source_ids)
+            rows = self._conn.execute(sql, params).fetchall()
+
+            scores = Counter()
+            for chunk_id, term, tf, length in rows:
+                df = doc_freqs[term]
+                idf = math.log(1 + (n_chunks - df + 0.5) / (df + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / (avg_length or 1))
+                scores[chunk_id] += idf * tf * (self.k1 + 1) / norm
+
+            top = scores.most_common(k)
+            if not top:
+                return []
+            placeholders = ",".join("?" * len(top))
+            chunks = {
+                chunk_id: (text, metadata)
+                for chunk_id, text, metadata in self._conn.execute(
+                    f"SELECT chunk_id, text, metadata FROM chunks WHERE chunk_id IN ({placeholders})",
+                    [chunk_id for chunk_id, _ in top]
+                ).fetchall()
+            }
+
+        return [
+            (Document(page_content=chunks[chunk_id][0], metadata=json.loads(chunks[chunk_id][1])), score)
+            for chunk_id, score in top
+        ]
+
+    def count(self) -> int:
+        """Return the number of indexed chunks."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
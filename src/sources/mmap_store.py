@@ -0,0 +1,381 @@
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Tuple
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+def _source_ids_from_filter(filter: Optional[dict]) -> Optional[List[str]]:
+    """Accept the Chroma-style source filters built by the chat retrieval code."""
+    if not filter:
+        return None
+    if set(filter) != {"source_id"}:
+        raise ValueError(f"Unsupported filter: {filter}")
+    condition = filter["source_id"]
+    if isinstance(condition, dict):
+        if set(condition) != {"$in"}:
+            raise ValueError(f"Unsupported filter: {filter}")
+        return list(condition["$in"])
+    return [condition]
+
+
+class MmapVectorStore(VectorStore):
+    """
+    Vector store backed by memory-mapped, int8-quantized embedding files.
+
+    Each collection is a directory holding three append-only arrays: int8 codes
+    with one float32 scale per vector (a quarter of the float32 size, scanned on
+    every query), and the float32 vectors themselves, which are only paged in
+    for the few candidates that get exactly re-ranked. Texts and metadata live
+    in SQLite. Vectors are L2-normalized, so scores are cosine similarities.
+    Opening a collection maps the files without reading any vectors, so cold
+    starts only load the chunk table's row/source columns.
+
+    Deletes and replaced chunks are tombstoned; `compact` rewrites the files.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embedding_function: Embeddings,
+        rerank_factor: int = 8,
+        block_rows: int = 4096
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            path: Directory of the collection
+            embedding_function: Embeddings used for add_texts and text queries
+            rerank_factor: Candidates per result taken from the int8 scan for exact re-ranking
+            block_rows: Rows scored per vectorized block; small blocks keep the
+                dequantized scratch buffer in cache and bound scan memory
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._embedding = embedding_function
+        self.rerank_factor = rerank_factor
+        self.block_rows = block_rows
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path / "meta.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "row INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE NOT NULL, source_id TEXT, "
+            "text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks(source_id)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+        row = self._conn.execute("SELECT value FROM info WHERE key = 'dim'").fetchone()
+        self.dim = int(row[0]) if row else None
+        self._load_state()
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self._embedding
+
+    # Storage
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    def _row_bytes(self) -> dict:
+        return {"codes.i8": self.dim, "scales.f32": 4, "vectors.f32": 4 * self.dim}
+
+    def _n_rows(self) -> int:
+        """Return the number of complete rows, truncating any partially appended row."""
+        if self.dim is None:
+            return 0
+        row_bytes = self._row_bytes()
+        sizes = {name: self._file(name).stat().st_size if self._file(name).exists() else 0 for name in row_bytes}
+        n_rows = min(sizes[name] // row_bytes[name] for name in row_bytes)
+        for name, size in sizes.items():
+            if size != n_rows * row_bytes[name]:
+                with open(self._file(name), "r+b" if size else "wb") as f:
+                    f.truncate(n_rows * row_bytes[name])
+        return n_rows
+
+    def _load_state(self):
+        """Rebuild the in-memory live mask and source codes from SQLite."""
+        n_rows = self._n_rows()
+        self._live = np.zeros(n_rows, dtype=bool)
+        self._row_sources = np.full(n_rows, -1, dtype=np.int32)
+        self._source_codes = {}
+        for source_id, rows in self._conn.execute("SELECT source_id, group_concat(row) FROM chunks GROUP BY source_id"):
+            rows = np.array(rows.split(","), dtype=np.int64)
+            # Rows past the end of the files were never fully written
+            rows = rows[rows < n_rows]
+            self._live[rows] = True
+            self._row_sources[rows] = self._source_code(source_id)
+        self._maps = None
+
+    def _source_code(self, source_id: Optional[str]) -> int:
+        return self._source_codes.setdefault(source_id, len(self._source_codes))
+
+    def _get_maps(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return (codes, scales, vectors) memory maps covering every written row."""
+        n_rows = len(self._live)
+        if self._maps is None or len(self._maps[1]) != n_rows:
+            self._maps = (
+                np.memmap(self._file("codes.i8"), dtype=np.int8, mode="r", shape=(n_rows, self.dim)),
+                np.memmap(self._file("scales.f32"), dtype=np.float32, mode="r", shape=(n_rows,)),
+                np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(n_rows, self.dim)),
+            )
+        return self._maps
+
+    @staticmethod
+    def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric per-vector int8 quantization."""
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def upsert_embeddings(
+        self,
+        ids: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[dict],
+        documents: List[str]
+    ):
+        """
+        Add chunks with precomputed embeddings, replacing chunks with the same IDs.
+
+        Args:
+            ids: Chunk IDs
+            embeddings: One embedding per chunk
+            metadatas: One metadata dict per chunk
+            documents: One text per chunk
+        """
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._conn.execute("INSERT INTO info (key, value) VALUES ('dim', ?)", (str(self.dim),))
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match store dimension {self.dim}")
+
+            self._delete(ids)
+            start = len(self._live)
+            codes, scales = self._quantize(vectors)
+            for name, data in (("codes.i8", codes), ("scales.f32", scales), ("vectors.f32", vectors)):
+                with open(self._file(name), "ab") as f:
+                    f.write(data.tobytes())
+
+            rows = range(start, start + len(ids))
+            self._conn.executemany(
+                "INSERT INTO chunks (row, chunk_id, source_id, text, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (row, chunk_id, metadata.get("source_id"), text, json.dumps(metadata))
+                    for row, chunk_id, metadata, text in zip(rows, ids, metadatas, documents)
+                ]
+            )
+            self._conn.commit()
+
+            self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+            self._row_sources = np.concatenate([
+                self._row_sources,
+                np.array([self._source_code(metadata.get("source_id")) for metadata in metadatas], dtype=np.int32)
+            ])
+
+    def update_metadatas(self, ids: List[str], metadatas: List[dict]):
+        """Replace the metadata of existing chunks without touching their vectors."""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE chunks SET source_id = ?, metadata = ? WHERE chunk_id = ?",
+                [(metadata.get("source_id"), json.dumps(metadata), chunk_id) for chunk_id, metadata in zip(ids, metadatas)]
+            )
+            self._conn.commit()
+            for chunk_id, metadata in zip(ids, metadatas):
+                row = self._conn.execute("SELECT row FROM chunks WHERE chunk_id = ?", (chunk_id,)).fetchone()
+                if row is not None:
+                    self._row_sources[row[0]] = self._source_code(metadata.get("source_id"))
+
+    def get_ids(self, source_id: Optional[str] = None) -> List[str]:
+        """Return the IDs of all chunks, or of one source's chunks."""
+        with self._lock:
+            if source_id is None:
+                return [row[0] for row in self._conn.execute("SELECT chunk_id FROM chunks")]
+            return [row[0] for row in self._conn.execute("SELECT chunk_id FROM chunks WHERE source_id = ?", (source_id,))]
+
+    def get_metadatas(self) -> List[dict]:
+        """Return the metadata of every chunk."""
+        with self._lock:
+            return [json.loads(row[0]) for row in self._conn.execute("SELECT metadata FROM chunks")]
+
+    def count(self) -> int:
+        """Return the number of live chunks."""
+        return int(self._live.sum())
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete chunks by ID."""
+        if not ids:
+            return False
+        with self._lock:
+            self._delete(ids)
+            self._conn.commit()
+        return True
+
+    def _delete(self, ids: List[str]):
+        for i in range(0, len(ids), 500):
+            batch = list(ids[i:i + 500])
+            placeholders = ",".join("?" * len(batch))
+            rows = [row[0] for row in self._conn.execute(f"SELECT row FROM chunks WHERE chunk_id IN ({placeholders})", batch)]
+            self._live[rows] = False
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+
+    def compact(self):
+        """Rewrite the vector files without tombstoned rows."""
+        with self._lock:
+            live_rows = np.flatnonzero(self._live)
+            if len(live_rows) == len(self._live):
+                return
+            codes, scales, vectors = self._get_maps()
+            for name, data in (("codes.i8", codes), ("scales.f32", scales), ("vectors.f32", vectors)):
+                tmp = self._file(name + ".tmp")
+                with open(tmp, "wb") as f:
+                    for i in range(0, len(live_rows), self.block_rows):
+                        f.write(np.ascontiguousarray(data[live_rows[i:i + self.block_rows]]).tobytes())
+            self._maps = None
+            for name in ("codes.i8", "scales.f32", "vectors.f32"):
+                self._file(name + ".tmp").replace(self._file(name))
+            new_rows = {int(old): new for new, old in enumerate(live_rows)}
+            for old, new in sorted(new_rows.items()):
+                self._conn.execute("UPDATE chunks SET row = ? WHERE row = ?", (new, old))
+            self._conn.commit()
+            self._load_state()
+            logger.info(f"Compacted {self.path} to {len(live_rows)} rows")
+
+    # Search
+
+    def _search(self, query: np.ndarray, k: int, source_ids: Optional[List[str]]) -> List[Tuple[int, float]]:
+        """Return (row, cosine similarity) of the top k live rows."""
+        with self._lock:
+            if self.dim is None or not self._live.any():
+                return []
+            codes, scales, vectors = self._get_maps()
+            mask = self._live.copy()
+            if source_ids is not None:
+                allowed = [self._source_codes[s] for s in source_ids if s in self._source_codes]
+                mask &= np.isin(self._row_sources, allowed)
+
+        query = query.astype(np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        n_candidates = max(k * self.rerank_factor, k)
+
+        # Approximate int8 scan in bounded blocks, keeping the best candidates
+        cand_rows = np.empty(0, dtype=np.int64)
+        cand_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, len(mask), self.block_rows):
+            block_mask = mask[start:start + self.block_rows]
+            if not block_mask.any():
+                continue
+            scores = (codes[start:start + self.block_rows].astype(np.float32) @ query) * scales[start:start + self.block_rows]
+            scores[~block_mask] = -np.inf
+            rows = np.arange(start, start + len(scores))
+            cand_rows = np.concatenate([cand_rows, rows])
+            cand_scores = np.concatenate([cand_scores, scores])
+            if len(cand_rows) > n_candidates:
+                keep = np.argpartition(-cand_scores, n_candidates)[:n_candidates]
+                cand_rows, cand_scores = cand_rows[keep], cand_scores[keep]
+        cand_rows = cand_rows[np.isfinite(cand_scores)]
+        if not len(cand_rows):
+            return []
+
+        # Exact re-ranking against the full-precision vectors of the candidates only
+        cand_rows = np.sort(cand_rows)
+        exact = vectors[cand_rows] @ query
+        order = np.argsort(-exact)[:k]
+        return [(int(cand_rows[i]), float(exact[i])) for i in order]
+
+    def _rows_to_docs(self, results: List[Tuple[int, float]]) -> List[Tuple[Document, float]]:
+        if not results:
+            return []
+        with self._lock:
+            placeholders = ",".join("?" * len(results))
+            rows = {
+                row: (text, metadata)
+                for row, text, metadata in self._conn.execute(
+                    f"SELECT row, text, metadata FROM chunks WHERE row IN ({placeholders})",
+                    [row for row, _ in results]
+                )
+            }
+        return [
+            (Document(page_content=rows[row][0], metadata=json.loads(rows[row][1])), score)
+            for row, score in results
+            if row in rows
+        ]
+
+    def similarity_search_by_vector_with_score(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None
+    ) -> List[Tuple[Document, float]]:
+        """Return the k most similar chunks to an embedding, with cosine similarities."""
+        results = self._search(np.asarray(embedding, dtype=np.float32), k, _source_ids_from_filter(filter))
+        return self._rows_to_docs(results)
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(self._embedding.embed_query(query), k=k, filter=filter)
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] -> relevance in [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+        self.upsert_embeddings(ids, self._embedding.embed_documents(texts), metadatas, texts)
+        return ids
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        path: str = ".cache/mmap_vectordb/document_chunks",
+        **kwargs: Any
+    ) -> "MmapVectorStore":
+        store = cls(path=path, embedding_function=embedding)
+        store.add_texts(texts, metadatas=metadatas, ids=kwargs.get("ids"))
+        return store
+
+    def close(self):
+        """Close the metadata database."""
+        with self._lock:
+            self._maps = None
+            self._conn.close()
@@ -0,0 +1,115 @@
+from pathlib import Path
+from typing import Optional, List, BinaryIO
+import hashlib
+import json
+import logging
+import threading
+
+HASH_BLOCK_SIZE = 1 << 20  # 1 MiB
+
+
+def hash_stream(stream: BinaryIO, sink: Optional[BinaryIO] = None) -> str:
+    """
+    Hash a binary stream block by block, optionally copying it to a sink.
+
+    Args:
+        stream: Readable binary stream (e.g. an uploaded file)
+        sink: Optional writable binary stream that receives every block
+
+    Returns:
+        str: Hex SHA-256 digest of the stream content
+    """
+    hasher = hashlib.sha256()
+    while block := stream.read(HASH_BLOCK_SIZE):
+        hasher.update(block)
+        if sink is not None:
+            sink.write(block)
+    return hasher.hexdigest()
+
+
+def hash_file(file_path: str) -> str:
+    """Return the hex SHA-256 digest of a file on disk."""
+    with open(file_path, "rb") as f:
+        return hash_stream(f)
+
+
+class ParseStore:
+    """Content-addressed index of parsed documents, keyed on a hash of the raw file bytes."""
+
+    def __init__(self, index_path: Path):
+        """
+        Initialize the store.
+
+        Args:
+            index_path: Path to the JSON index file
+        """
+        self.index_path = Path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._records = self._load()
+
+    def _load(self) -> dict:
+        if not self.index_path.exists():
+            return {}
+        try:
+            return json.loads(self.index_path.read_text())
+        except Exception as e:
+            logging.error(f"Error loading parse store index {self.index_path}: {str(e)}")
+            return {}
+
+    def _flush(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._records, indent=2))
+        tmp_path.replace(self.index_path)
+
+    def get(self, content_hash: str) -> Optional[dict]:
+        """
+        Look up a parsed document by content hash.
+
+        Args:
+            content_hash: Hex digest of the raw file bytes
+
+        Returns:
+            Optional[dict]: Record with markdown_path and an `indexed` map of
+                index key ("<backend>:<collection>") -> {source_id, chunk_ids}, or None if the content
+                has not been parsed (or its output is gone)
+        """
+        with self._lock:
+            record = self._records.get(content_hash)
+            if record is None:
+                return None
+            if not Path(record["markdown_path"]).exists():
+                del self._records[content_hash]
+                self._flush()
+                return None
+            return json.loads(json.dumps(record))
+
+    def put(self, content_hash: str, markdown_path: str, index_key: str, source_id: str, chunk_ids: List[str]):
+        """
+        Record the parse output for a content hash and its indexing in a collection.
+
+        `index_key` names the backend and collection ("<backend>:<collection>").
+        Entries of earlier content for the same source under the same key are
+        dropped, since re-indexing the source replaced their chunks.
+        """
+        with self._lock:
+            self._drop_source(index_key, source_id)
+            record = self._records.setdefault(content_hash, {"markdown_path": markdown_path, "indexed": {}})
+            record["markdown_path"] = markdown_path
+            record["indexed"][index_key] = {
+                "source_id": source_id,
+                "chunk_ids": list(chunk_ids),
+            }
+            self._flush()
+
+    def remove_source(self, index_key: str, source_id: str):
+        """Drop the indexing entries of a source in a collection (parsed markdown stays reusable)."""
+        with self._lock:
+            self._drop_source(index_key, source_id)
+            self._flush()
+
+    def _drop_source(self, index_key: str, source_id: str):
+        for record in self._records.values():
+            entry = record["indexed"].get(index_key)
+            if entry is not None and entry["source_id"] == source_id:
+                del record["indexed"][index_key]
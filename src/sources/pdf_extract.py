@@ -0,0 +1,74 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
+import multiprocessing
+import os
+
+import pypdf
+
+# Kept free of langchain/chroma imports: worker processes import this module on spawn.
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) of a PDF (runs in a worker process)."""
+    with open(file_path, "rb") as file:
+        pdf = pypdf.PdfReader(file)
+        return [pdf.pages[i].extract_text() for i in range(start, stop)]
+
+
+def count_pdf_pages(file_path: str) -> int:
+    """Return the number of pages in a PDF."""
+    with open(file_path, "rb") as file:
+        return len(pypdf.PdfReader(file).pages)
+
+
+def iter_pdf_pages(
+    file_path: str,
+    workers: Optional[int] = None,
+    pages_per_task: int = 16,
+    min_parallel_pages: int = 64,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_number, text) for every page of a PDF, in page order.
+
+    Pages are extracted by a process pool in fixed-size page ranges. At most
+    two ranges per worker are in flight, so memory stays bounded and callers
+    can start consuming the first pages before the last ones are extracted.
+
+    Args:
+        file_path: Path to the PDF file
+        workers: Number of worker processes. None uses the CPU count; 1 extracts serially
+        pages_per_task: Number of pages each worker extracts per task
+        min_parallel_pages: PDFs with fewer pages are extracted serially
+
+    Yields:
+        Tuple[int, str]: 1-based page number and the extracted page text
+    """
+    file_path = str(file_path)
+    workers = workers or os.cpu_count() or 1
+
+    if workers <= 1:
+        with open(file_path, "rb") as file:
+            pdf = pypdf.PdfReader(file)
+            for i, page in enumerate(pdf.pages):
+                yield i + 1, page.extract_text()
+        return
+
+    n_pages = count_pdf_pages(file_path)
+    if n_pages < min_parallel_pages:
+        yield from iter_pdf_pages(file_path, workers=1)
+        return
+
+    ranges = deque((start, min(start + pages_per_task, n_pages)) for start in range(0, n_pages, pages_per_task))
+    max_in_flight = workers * 2
+
+    # spawn keeps workers independent of the (multi-threaded) Streamlit server process
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending = deque()
+        while ranges or pending:
+            while ranges and len(pending) < max_in_flight:
+                start, stop = ranges.popleft()
+                pending.append((start, pool.submit(_extract_page_range, file_path, start, stop)))
+            start, future = pending.popleft()
+            for offset, text in enumerate(future.result()):
+                yield start + offset + 1, text
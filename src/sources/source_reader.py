@@ -0,0 +1,264 @@
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+import hashlib
+import logging
+import mmap
+import threading
+import time
+import urllib.request
+
+logger = logging.getLogger(__name__)
+
+SEPARATOR = "\n\n"
+
+
+def is_url(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+class _TextExtractor(HTMLParser):
+    """Collect the visible text of an HTML page, one block element per paragraph."""
+
+    SKIP = {"script", "style", "noscript", "head", "nav", "footer", "svg"}
+    BLOCKS = {"p", "div", "section", "article", "li", "br", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote"}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return SEPARATOR.join(line for line in lines if line)
+
+
+def load_url(url: str, timeout: float = 20.0, max_bytes: int = 20 * 1024 * 1024) -> str:
+    """
+    Download a URL source and return its text.
+
+    HTML pages are reduced to their visible text; other text responses are
+    returned as is.
+
+    Args:
+        url: http(s) URL
+        timeout: Request timeout in seconds
+        max_bytes: Maximum response size read
+
+    Returns:
+        str: Text content of the page
+    """
+    request = urllib.request.Request(url, headers={"User-Agent": "notebooklm-clone/0.1"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read(max_bytes)
+        charset = response.headers.get_content_charset() or "utf-8"
+        content_type = response.headers.get_content_type()
+    text = body.decode(charset, errors="replace")
+    if content_type in ("text/html", "application/xhtml+xml"):
+        extractor = _TextExtractor()
+        extractor.feed(text)
+        return extractor.text()
+    return text
+
+
+@dataclass
+class SourceEntry:
+    """Content of one source with the file state it was read at."""
+    source: str
+    fingerprint: str
+    length: int
+    mtime_ns: int = 0
+    size: int = 0
+    text_value: Optional[str] = None
+    view: Optional[mmap.mmap] = None
+
+    @property
+    def text(self) -> str:
+        # Large files stay memory-mapped and are decoded only when their text is needed
+        if self.text_value is not None:
+            return self.text_value
+        return self.view[:].decode("utf-8", errors="replace")
+
+
+class SourceView:
+    """
+    Ordered, lazily concatenated view of the notebook's sources.
+
+    Iterating yields (source, text) pairs without building the combined string;
+    `text` joins the sources on first access. `fingerprint` identifies the
+    ordered contents and changes whenever any source does.
+    """
+
+    def __init__(self, entries: List[SourceEntry]):
+        self.entries = entries
+        self._text = None
+        hasher = hashlib.sha256()
+        for entry in entries:
+            hasher.update(f"{entry.fingerprint}\x00".encode("ascii"))
+        self.fingerprint = hasher.hexdigest()
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        for entry in self.entries:
+            yield entry.source, entry.text
+
+    def __len__(self) -> int:
+        """
+        Approximate length of the combined text in characters.
+
+        Memory-mapped files are counted in bytes rather than decoded, which is
+        exact for ASCII and otherwise an upper bound on their characters, so
+        size thresholds may be crossed slightly early for non-ASCII text.
+        """
+        return sum(entry.length for entry in self.entries) + len(SEPARATOR) * max(len(self.entries) - 1, 0)
+
+    def __bool__(self) -> bool:
+        return any(entry.length for entry in self.entries)
+
+    @property
+    def text(self) -> str:
+        """The sources joined by blank lines, as read_source_files used to return."""
+        if self._text is None:
+            self._text = SEPARATOR.join(text for _, text in self)
+        return self._text
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class SourceReader:
+    """
+    Cache of source contents keyed on path, modification time and size.
+
+    Unchanged files are served from memory after a single stat call. Files of
+    at least `mmap_threshold` bytes are memory-mapped instead of decoded, so
+    the page cache rather than the Python heap holds them. Decoded text is
+    evicted least recently used beyond `max_bytes`. URL sources are fetched
+    with `load_url` and kept for `url_ttl` seconds.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, mmap_threshold: int = 8 * 1024 * 1024, url_ttl: float = 3600.0):
+        """
+        Initialize the reader.
+
+        Args:
+            max_bytes: Budget for decoded text kept in memory
+            mmap_threshold: File size from which files are memory-mapped
+            url_ttl: Seconds a fetched URL stays cached
+        """
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.url_ttl = url_ttl
+        self._entries = {}
+        self._url_fetched_at = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, sources: List[str]) -> Tuple[SourceView, List[Tuple[str, Exception]]]:
+        """
+        Read sources in order.
+
+        Args:
+            sources: File paths or URLs
+
+        Returns:
+            Tuple[SourceView, List[Tuple[str, Exception]]]: View of the sources that could be
+            read, and the (source, error) pairs of those that could not
+        """
+        entries = []
+        errors = []
+        for source in sources:
+            try:
+                entries.append(self._read_url(source) if is_url(source) else self._read_file(source))
+            except Exception as e:
+                logger.error(f"Error reading source {source}: {str(e)}")
+                errors.append((source, e))
+        return SourceView(entries), errors
+
+    def _read_file(self, source: str) -> SourceEntry:
+        stat = Path(source).stat()
+        with self._lock:
+            entry = self._entries.get(source)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.hits += 1
+                # Move to the end of the LRU order
+                self._entries[source] = self._entries.pop(source)
+                return entry
+            self.misses += 1
+
+        if stat.st_size >= self.mmap_threshold:
+            with open(source, "rb") as f:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            entry = SourceEntry(
+                source=source,
+                fingerprint=hashlib.sha256(view).hexdigest(),
+                length=stat.st_size,
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                view=view
+            )
+        else:
+            data = Path(source).read_bytes()
+            text = data.decode("utf-8", errors="replace")
+            entry = SourceEntry(
+                source=source,
+                fingerprint=hashlib.sha256(data).hexdigest(),
+                length=len(text),
+                mtime_ns=stat.st_mtime_ns,
+                size=stat.st_size,
+                text_value=text
+            )
+        self._store(source, entry)
+        return entry
+
+    def _read_url(self, url: str) -> SourceEntry:
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None and time.monotonic() - self._url_fetched_at.get(url, 0.0) < self.url_ttl:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        text = load_url(url)
+        data = text.encode("utf-8")
+        entry = SourceEntry(source=url, fingerprint=hashlib.sha256(data).hexdigest(), length=len(text), size=len(data), text_value=text)
+        self._store(url, entry, fetched_at=time.monotonic())
+        return entry
+
+    def _store(self, source: str, entry: SourceEntry, fetched_at: Optional[float] = None):
+        with self._lock:
+            if fetched_at is not None:
+                self._url_fetched_at[source] = fetched_at
+            # Replaced or evicted mmaps are not closed here: views handed out earlier may still
+            # read them, and they are unmapped once the last reference goes
+            self._entries.pop(source, None)
+            self._entries[source] = entry
+            # Only decoded text counts against the budget; mapped files live in the page cache
+            total = sum(e.size for e in self._entries.values() if e.text_value is not None)
+            for key in list(self._entries):
+                if total <= self.max_bytes or key == source:
+                    break
+                evicted = self._entries.pop(key)
+                self._url_fetched_at.pop(key, None)
+                if evicted.text_value is not None:
+                    total -= evicted.size
+
+    def get_stats(self) -> dict:
+        """Get hit/miss counts and the number of cached sources."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
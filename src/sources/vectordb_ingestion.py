@@ -1,27 +1,105 @@
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Iterable, Iterator, Tuple, Callable, TextIO
+import hashlib
 import logging
-from datetime import datetime
+import queue
+import threading
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
-from langchain_chroma import Chroma
-from langchain_google_vertexai import VertexAIEmbeddings
+
+from src.utils.registry import get_embeddings, get_vectorstore, get_lexical_index, get_query_cache
+from .embedding_executor import EmbeddingExecutor
 
 import dotenv
 dotenv.load_dotenv()
 
+# Sentinel closing a pipeline stage queue
+_DONE = object()
+
+
+def iter_text_blocks(file_path: str, block_chars: int = 65536) -> Iterator[str]:
+    """
+    Read a text file in bounded blocks, cutting at paragraph boundaries where possible.
+    
+    Blocks are consecutive slices of the file: each cut falls just after a
+    paragraph break, or after a line break or space when a block has none, so
+    no character is dropped and words are only split when a block has no
+    whitespace at all. Joining the blocks with "" reproduces the file, and a
+    block starts at the summed length of the blocks before it.
+    
+    Args:
+        file_path: Path to the text file
+        block_chars: Approximate number of characters per block
+        
+    Yields:
+        str: Consecutive blocks of the file
+    """
+    with open(file_path, "r") as f:
+        yield from iter_stream_blocks(f, block_chars)
+
+
+def iter_stream_blocks(f: TextIO, block_chars: int = 65536, buffer: str = "") -> Iterator[str]:
+    """Yield consecutive blocks of an open text file, prefixed by `buffer`, cut as iter_text_blocks does."""
+    while data := f.read(block_chars):
+        buffer += data
+        if len(buffer) < block_chars:
+            continue
+        for separator in ("\n\n", "\n", " "):
+            cut = buffer.rfind(separator)
+            if cut > 0:
+                cut += len(separator)
+                break
+        else:
+            cut = len(buffer)
+        yield buffer[:cut]
+        buffer = buffer[cut:]
+    if buffer:
+        yield buffer
+
+
+def _run_stage(fn: Callable, inbox: queue.Queue, outbox: Optional[queue.Queue], errors: list):
+    """Apply fn to every item of inbox, forwarding results to outbox, until the sentinel arrives."""
+    while (item := inbox.get()) is not _DONE:
+        if errors:
+            # Keep draining after a failure so upstream stages never block
+            continue
+        try:
+            result = fn(item)
+            if outbox is not None:
+                outbox.put(result)
+        except Exception as e:
+            errors.append(e)
+    if outbox is not None:
+        outbox.put(_DONE)
+
+
 class VectorDBIngestion:
-    """Handle document chunking and ingestion into Chroma vector database."""
+    """Handle document chunking and ingestion into the vector database (Chroma or the mmap backend)."""
     
-    def __init__(self, persist_dir: Optional[str] = None):
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        collection_name: str = "document_chunks",
+        batch_size: int = 256,
+        max_pending_batches: int = 2,
+        embedding_concurrency: int = 4
+    ):
         """
         Initialize the ingestion handler.
         
         Args:
             persist_dir: Directory to persist the vector database. 
                        If None, uses .cache/vectordb
+            collection_name: Vector store collection to index into; one per notebook
+            batch_size: Number of chunks embedded and upserted per pipeline batch.
+                Each batch is split further into concurrent embedding requests
+            max_pending_batches: Queue depth between pipeline stages; bounds peak memory
+                to roughly (2 * max_pending_batches + 3) batches regardless of document size
+            embedding_concurrency: Maximum number of embedding requests in flight
         """
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches
         self.persist_dir = Path(persist_dir) if persist_dir else Path(".cache/vectordb")
         self.persist_dir.mkdir(parents=True, exist_ok=True)
         
@@ -30,19 +108,20 @@ class VectorDBIngestion:
             chunk_size=1000,
             chunk_overlap=200,
             length_function=len,
-            separators=["\n\n", "\n", " ", ""]
+            separators=["\n\n", "\n", " ", ""],
+            add_start_index=True
         )
         
-        # Initialize embeddings and vector store
-        self.embeddings = VertexAIEmbeddings(model_name="text-embedding-005")
+        # Shared (disk-cached) embeddings and vector store from the process-wide registry
+        self.embeddings = get_embeddings()
+        self.embedding_executor = EmbeddingExecutor(self.embeddings, max_concurrency=embedding_concurrency)
         
-        # Initialize Chroma collection
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        self.vectordb = Chroma(
-            persist_directory=str(self.persist_dir),
-            collection_name=f"document_chunks",
-            embedding_function=self.embeddings
-        )
+        # Initialize the vector store collection (backend selected by NOTEBOOKLM_VECTOR_BACKEND)
+        self.collection_name = collection_name
+        self.vectordb = get_vectorstore(collection_name, persist_dir=str(self.persist_dir))
+        
+        # BM25 index kept in sync with the collection for lexical and hybrid retrieval
+        self.lexical_index = get_lexical_index(collection_name)
         self.retriever = self.vectordb.as_retriever(search_kwargs={"k": 5})
     
     def process_document(self, file_path: str, source_id: Optional[str] = None) -> List[str]:
@@ -54,33 +133,211 @@ class VectorDBIngestion:
             source_id: Optional unique identifier for the source
             
         Returns:
-            List[str]: List of chunk IDs added to the database
+            List[str]: List of chunk IDs for the source in the database
+        """
+        # Stream the markdown file in bounded blocks
+        pages = ((None, block) for block in iter_text_blocks(file_path))
+        return self.process_pages(pages, source=file_path, source_id=source_id)
+    
+    def process_pages(
+        self,
+        pages: Iterable[Tuple[Optional[int], str]],
+        source: str,
+        source_id: Optional[str] = None
+    ) -> List[str]:
         """
+        Chunk a stream of document pages and incrementally index them.
+        
+        Runs a bounded pipeline: the calling thread consumes pages and splits them
+        into batches of `batch_size` chunks, an embedding thread embeds each batch,
+        and an upsert thread writes it to Chroma. Stages are connected by queues of
+        depth `max_pending_batches`, so a slow stage applies backpressure upstream,
+        peak memory stays flat for any document size, and embedding of batch N
+        overlaps with splitting of batch N+1. Each chunk keeps its page number.
+        
+        Chunk IDs are derived from the source ID and a hash of the chunk, so
+        re-indexing a source only embeds and upserts chunks that changed. Chunks
+        that are no longer produced are deleted once the stream ends.
+        
+        Args:
+            pages: Iterable of (1-based page number or None, page text), in order. Pageless
+                text must be split into consecutive blocks whose concatenation is the document
+            source: Path of the parsed document, stored as chunk metadata
+            source_id: Optional unique identifier for the source
+            
+        Returns:
+            List[str]: List of chunk IDs for the source in the database
+        """
+        source_id = source_id or source
+        existing_ids = set(self.get_source_chunk_ids(source_id))
+        
+        to_embed = queue.Queue(maxsize=self.max_pending_batches)
+        to_upsert = queue.Queue(maxsize=self.max_pending_batches)
+        errors = []
+        stages = [
+            threading.Thread(target=_run_stage, args=(self._embed_batch, to_embed, to_upsert, errors), daemon=True),
+            threading.Thread(target=_run_stage, args=(self._upsert_batch, to_upsert, None, errors), daemon=True),
+        ]
+        for stage in stages:
+            stage.start()
+        
+        ids = []
+        n_new = 0
         try:
-            # Read the markdown file
-            content = Path(file_path).read_text()
+            for batch_ids, chunks in self._iter_chunk_batches(pages, source, source_id):
+                if errors:
+                    break
+                is_new = [chunk_id not in existing_ids for chunk_id in batch_ids]
+                to_embed.put((batch_ids, chunks, is_new))
+                ids.extend(batch_ids)
+                n_new += sum(is_new)
+        except Exception as e:
+            logging.error(f"Error processing document {source}: {str(e)}")
+            raise
+        finally:
+            to_embed.put(_DONE)
+            for stage in stages:
+                stage.join()
+        
+        if errors:
+            logging.error(f"Error processing document {source}: {str(errors[0])}")
+            raise errors[0]
+        
+        stale_ids = existing_ids.difference(ids)
+        self._delete_ids(list(stale_ids))
+        get_query_cache().invalidate(self.collection_name)
+        
+        logging.info(
+            f"Indexed {source}: {n_new} new, {len(ids) - n_new} unchanged, "
+            f"{len(stale_ids)} removed chunks"
+        )
+        return ids
+    
+    @property
+    def _is_mmap_backend(self) -> bool:
+        # The memory-mapped backend takes precomputed embeddings directly; Chroma goes
+        # through its underlying collection
+        return hasattr(self.vectordb, "upsert_embeddings")
+    
+    def get_source_chunk_ids(self, source_id: str) -> List[str]:
+        """Return the IDs of all chunks indexed for a source."""
+        if self._is_mmap_backend:
+            return self.vectordb.get_ids(source_id)
+        return self.vectordb._collection.get(where={"source_id": source_id}, include=[])["ids"]
+    
+    def delete_source(self, source_id: str) -> int:
+        """
+        Delete every chunk of a source from the vector database.
+        
+        Args:
+            source_id: Identifier the source was indexed with
             
-            # Create metadata
+        Returns:
+            int: Number of chunks deleted
+        """
+        ids = self.get_source_chunk_ids(source_id)
+        self._delete_ids(ids)
+        get_query_cache().invalidate(self.collection_name)
+        logging.info(f"Deleted {len(ids)} chunks of {source_id} from vector database")
+        return len(ids)
+    
+    def _delete_ids(self, ids: List[str], batch_size: int = 1000):
+        for i in range(0, len(ids), batch_size):
+            if self._is_mmap_backend:
+                self.vectordb.delete(ids[i:i + batch_size])
+            else:
+                self.vectordb._collection.delete(ids=ids[i:i + batch_size])
+        self.lexical_index.delete(ids)
+    
+    def _iter_chunk_batches(
+        self,
+        pages: Iterable[Tuple[Optional[int], str]],
+        source: str,
+        source_id: str
+    ) -> Iterator[Tuple[List[str], List[Document]]]:
+        """Split pages into chunks and group them into (ids, chunks) batches of `batch_size`."""
+        source_key = hashlib.sha256(source_id.encode("utf-8")).hexdigest()[:12]
+        seen = set()
+        batch_ids = []
+        batch = []
+        # Pageless text arrives in consecutive blocks; positions count from the start of the document
+        block_offset = 0
+        for page, text in pages:
+            # Create metadata (Chroma rejects None values, so pages are optional)
             metadata = {
-                "source": file_path,
-                "source_id": source_id or file_path,
+                "source": source,
+                "source_id": source_id,
             }
-            
-            # Create Langchain document
-            doc = Document(page_content=content, metadata=metadata)
+            if page is not None:
+                metadata["page"] = page
             
             # Split into chunks
-            chunks = self.text_splitter.split_documents([doc])
-            
-            # Add to vector store
-            ids = self.vectordb.add_documents(chunks)
-            
-            logging.info(f"Added {len(ids)} chunks from {file_path} to vector database")
-            return ids
-            
-        except Exception as e:
-            logging.error(f"Error processing document {file_path}: {str(e)}")
-            raise
+            for chunk in self.text_splitter.split_documents([Document(page_content=text, metadata=metadata)]):
+                if page is None:
+                    chunk.metadata["start_index"] += block_offset
+                chunk_hash = hashlib.sha256(f"{page}\x00{chunk.page_content}".encode("utf-8")).hexdigest()[:32]
+                chunk_id = f"{source_key}-{chunk_hash}"
+                if chunk_id in seen:
+                    # Identical chunk on the same page: index it once
+                    continue
+                seen.add(chunk_id)
+                chunk.metadata["chunk_hash"] = chunk_hash
+                chunk.metadata["chunk_id"] = chunk_id
+                batch_ids.append(chunk_id)
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    yield batch_ids, batch
+                    batch_ids, batch = [], []
+            if page is None:
+                block_offset += len(text)
+        if batch:
+            yield batch_ids, batch
+    
+    def _embed_batch(self, batch: Tuple[List[str], List[Document], List[bool]]) -> Tuple[List[str], List[Document], List[bool], List[List[float]]]:
+        """Pipeline stage: embed the new chunks of one batch."""
+        ids, chunks, is_new = batch
+        embeddings = self.embedding_executor.embed([chunk.page_content for chunk, new in zip(chunks, is_new) if new])
+        return ids, chunks, is_new, embeddings
+    
+    def _upsert_batch(self, batch: Tuple[List[str], List[Document], List[bool], List[List[float]]]):
+        """Pipeline stage: upsert new chunks and refresh metadata of unchanged ones (adding any the BM25 index lacks)."""
+        ids, chunks, is_new, embeddings = batch
+        new = [(chunk_id, chunk) for chunk_id, chunk, flag in zip(ids, chunks, is_new) if flag]
+        unchanged = [(chunk_id, chunk) for chunk_id, chunk, flag in zip(ids, chunks, is_new) if not flag]
+        if new:
+            new_ids = [chunk_id for chunk_id, _ in new]
+            metadatas = [chunk.metadata for _, chunk in new]
+            documents = [chunk.page_content for _, chunk in new]
+            if self._is_mmap_backend:
+                self.vectordb.upsert_embeddings(new_ids, embeddings, metadatas, documents)
+            else:
+                self.vectordb._collection.upsert(
+                    ids=new_ids,
+                    embeddings=embeddings,
+                    metadatas=metadatas,
+                    documents=documents,
+                )
+            self.lexical_index.add(new_ids, documents, metadatas)
+        if unchanged:
+            # Same content, but the parsed file path may have changed; no re-embedding needed
+            unchanged_ids = [chunk_id for chunk_id, _ in unchanged]
+            metadatas = [chunk.metadata for _, chunk in unchanged]
+            if self._is_mmap_backend:
+                self.vectordb.update_metadatas(unchanged_ids, metadatas)
+            else:
+                self.vectordb._collection.update(ids=unchanged_ids, metadatas=metadatas)
+            # Chunks indexed before the BM25 index existed are added to it; the rest only need metadata
+            missing = set(self.lexical_index.missing(unchanged_ids))
+            if missing:
+                self.lexical_index.add(
+                    [chunk_id for chunk_id, _ in unchanged if chunk_id in missing],
+                    [chunk.page_content for chunk_id, chunk in unchanged if chunk_id in missing],
+                    [chunk.metadata for chunk_id, chunk in unchanged if chunk_id in missing]
+                )
+            self.lexical_index.update_metadata(
+                [chunk_id for chunk_id, _ in unchanged if chunk_id not in missing],
+                [chunk.metadata for chunk_id, chunk in unchanged if chunk_id not in missing]
+            )
     
     def invoke(self, query: str) -> List[Document]:
         """
@@ -96,14 +353,25 @@ class VectorDBIngestion:
         
         return self.retriever.invoke(query)
     
+    def close(self):
+        """Release the embedding worker pool."""
+        self.embedding_executor.shutdown()
+    
     def get_stats(self) -> dict:
         """Get statistics about the vector database."""
         try:
-            collection = self.client.get_collection("document_chunks")
-            count = collection.count()
+            if self._is_mmap_backend:
+                count = self.vectordb.count()
+                metadatas = self.vectordb.get_metadatas()
+            else:
+                collection = self.vectordb._collection
+                count = collection.count()
+                metadatas = collection.get(include=["metadatas"])["metadatas"]
             return {
                 "total_chunks": count,
-                "total_sources": len(set(m.get("source_id") for m in collection.get()["metadatas"] if m))
+                "total_sources": len(set(m.get("source_id") for m in metadatas if m)),
+                "embedding_cache": self.embeddings.get_stats(),
+                "embedding_executor": self.embedding_executor.get_stats()
             }
         except Exception as e:
             logging.error(f"Error getting stats: {str(e)}")
@@ -0,0 +1,122 @@
+"""
+Compare the memory-mapped int8 vector store against Chroma.
+
+Reports recall@k against exact float32 search, query latency and cold-open time
+on a synthetic clustered corpus:
+
+    python -m src.sources.vectorstore_benchmark --n 100000 --dim 768 --k 4
+"""
+from pathlib import Path
+from typing import Callable, List
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from src.sources.mmap_store import MmapVectorStore
+
+
+def make_corpus(n: int, dim: int, n_queries: int, n_clusters: int = 256, seed: int = 0):
+    """Generate clustered, L2-normalized vectors and queries drawn near the clusters."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, n_clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    queries = centers[rng.integers(0, n_clusters, n_queries)] + 0.5 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    """Ground truth: exact cosine top k for each query."""
+    return [set(np.argsort(-(vectors @ query))[:k].tolist()) for query in queries]
+
+
+def run_queries(search: Callable[[np.ndarray], List[int]], queries: np.ndarray, truth: List[set], k: int) -> dict:
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - started)
+        hits += len(expected.intersection(found[:k]))
+    latencies = np.array(latencies) * 1000
+    return {
+        f"recall@{k}": hits / (k * len(queries)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def benchmark_mmap(vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int, path: Path) -> dict:
+    store = MmapVectorStore(str(path), embedding_function=None)
+    ids = [str(i) for i in range(len(vectors))]
+    for start in range(0, len(vectors), 5000):
+        batch = slice(start, start + 5000)
+        store.upsert_embeddings(ids[batch], vectors[batch], [{"row": i} for i in range(start, min(start + 5000, len(vectors)))], ids[batch])
+    store.close()
+
+    started = time.perf_counter()
+    store = MmapVectorStore(str(path), embedding_function=None)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    def search(query):
+        return [doc.metadata["row"] for doc, _ in store.similarity_search_by_vector_with_score(query.tolist(), k=k)]
+
+    results = run_queries(search, queries, truth, k)
+    results["open_ms"] = open_ms
+    store.close()
+    return results
+
+
+def benchmark_chroma(vectors: np.ndarray, queries: np.ndarray, truth: List[set], k: int, path: Path) -> dict:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    ids = [str(i) for i in range(len(vectors))]
+    for start in range(0, len(vectors), 5000):
+        batch = slice(start, start + 5000)
+        collection.add(ids=ids[batch], embeddings=vectors[batch].tolist())
+    del collection, client
+
+    started = time.perf_counter()
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.get_collection("bench")
+    # Chroma loads the HNSW index on first query, so include it in the cold open
+    collection.query(query_embeddings=[queries[0].tolist()], n_results=k)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    def search(query):
+        return [int(i) for i in collection.query(query_embeddings=[query.tolist()], n_results=k)["ids"][0]]
+
+    results = run_queries(search, queries, truth, k)
+    results["open_ms"] = open_ms
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50_000, help="Number of vectors")
+    parser.add_argument("--dim", type=int, default=768, help="Vector dimension")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--k", type=int, default=4, help="Results per query")
+    parser.add_argument("--skip-chroma", action="store_true", help="Only benchmark the mmap store")
+    args = parser.parse_args()
+
+    vectors, queries = make_corpus(args.n, args.dim, args.queries)
+    truth = exact_top_k(vectors, queries, args.k)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {"mmap-int8": benchmark_mmap(vectors, queries, truth, args.k, Path(tmp) / "mmap")}
+        if not args.skip_chroma:
+            results["chroma-hnsw"] = benchmark_chroma(vectors, queries, truth, args.k, Path(tmp) / "chroma")
+
+    print(f"n={args.n} dim={args.dim} queries={args.queries} k={args.k}")
+    for name, metrics in results.items():
+        print(f"{name:12s} " + "  ".join(f"{key}={value:.3f}" for key, value in metrics.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from src.utils.utils import read_sources
+from src.sources.source_reader import SourceView
+
+logger = logging.getLogger(__name__)
+
+TOOL_LABELS = {
+    "summary": "Summary",
+    "faqs": "FAQs",
+    "outline": "Outline",
+    "podcast_script": "Podcast script",
+}
+
+
+def _format_podcast_script(script) -> str:
+    return "\n\n".join(f"**{segment.speaker.speaker_name}:** {segment.speaker_script}" for segment in script.script)
+
+
+def _tool_runner(name: str, sources: SourceView, podcast_settings: Optional[dict], use_cache: bool) -> Callable[[], str]:
+    """Return a blocking call producing the text result of a tool."""
+    if name == "summary":
+        from src.tools.summary import generate_summary
+        return lambda: generate_summary(use_cache=use_cache, sources=sources)
+    if name == "faqs":
+        from src.tools.faqs import generate_faqs
+        return lambda: generate_faqs(use_cache=use_cache, sources=sources)
+    if name == "outline":
+        from src.tools.outline import generate_outline
+        return lambda: generate_outline(use_cache=use_cache, sources=sources)
+    if name == "podcast_script":
+        from src.podcast.podcast_script import generate_podcast_script
+        settings = podcast_settings or {}
+
+        def run():
+            script, _ = generate_podcast_script(
+                n_participants=settings.get("n_participants", 2),
+                target_audience=settings.get("target_audience", "college students"),
+                duration_mins=settings.get("duration_mins", 15),
+                source_content=sources.text
+            )
+            return _format_podcast_script(script)
+        return run
+    raise ValueError(f"Unknown tool: {name}")
+
+
+async def _run_all(
+    runners: Dict[str, Callable[[], str]],
+    on_progress: Optional[Callable[[str, str, float], None]]
+) -> Dict[str, object]:
+    started = time.perf_counter()
+
+    async def run(name, runner):
+        try:
+            # Tools block on the model API; threads let them overlap
+            result = await asyncio.to_thread(runner)
+            status = "done"
+        except Exception as e:
+            logger.error(f"Error running {name}: {str(e)}")
+            result = e
+            status = "failed"
+        if on_progress:
+            on_progress(name, status, time.perf_counter() - started)
+        return name, result
+
+    if on_progress:
+        for name in runners:
+            on_progress(name, "running", 0.0)
+    return dict(await asyncio.gather(*[run(name, runner) for name, runner in runners.items()]))
+
+
+def run_tools(
+    tools: List[str],
+    on_progress: Optional[Callable[[str, str, float], None]] = None,
+    podcast_settings: Optional[dict] = None,
+    use_cache: bool = True
+) -> Dict[str, object]:
+    """
+    Run several tools concurrently over one read of the notebook's sources.
+
+    Progress callbacks run on the calling thread, so they may update the UI.
+
+    Args:
+        tools: Tool names from TOOL_LABELS
+        on_progress: Called with (tool, "running" | "done" | "failed", seconds since start)
+        podcast_settings: n_participants, target_audience and duration_mins for the podcast script
+        use_cache: Reuse cached tool results
+
+    Returns:
+        Dict[str, object]: Text result per tool, or the exception it raised
+    """
+    started = time.perf_counter()
+    sources = read_sources()
+    runners = {name: _tool_runner(name, sources, podcast_settings, use_cache) for name in tools}
+    results = asyncio.run(_run_all(runners, on_progress))
+    logger.info(f"Ran {len(tools)} tools in {time.perf_counter() - started:.2f}s")
+    return results
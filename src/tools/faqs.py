@@ -1,24 +1,18 @@
 import logging
-from typing import List
-from pathlib import Path
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from langchain_core.output_parsers import StrOutputParser
-import streamlit as st
 
-from src.utils.utils import read_source_files
+from src.utils.utils import read_sources
+from src.sources.source_reader import SourceView
+from src.utils.registry import get_chat_llm, get_tool_result_cache, DEFAULT_CHAT_MODEL
+from src.tools.result_cache import ToolResultCache
+from src.tools.map_reduce import map_reduce_generate, use_map_reduce
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize components
-llm = ChatVertexAI(
-    model="gemini-1.5-flash-002",
-    max_output_tokens=1024,
-    temperature=0.7,
-)
 
 # Create the FAQs prompt
 faqs_prompt = ChatPromptTemplate.from_messages([
@@ -37,26 +31,80 @@ faqs_prompt = ChatPromptTemplate.from_messages([
     ("user", "Content to analyze: \n\n {source_content}")
 ])
 
-# Create the FAQs chain
-faqs_chain = faqs_prompt | llm | StrOutputParser()
+# Map-reduce prompts for corpora too large for one call
+faqs_map_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at identifying frequently asked questions from documents.
+    List the most important questions users might have about the provided part of a larger collection
+    of documents, each with a clear and concise answer.
+    
+    Format each FAQ as:
+    Q: [Question]
+    A: [Answer]
+    """),
+    ("user", "Content to analyze: \n\n {source_content}")
+])
+
+faqs_reduce_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at creating frequently asked questions from documents.
+    You are given FAQs drafted from the parts of a collection of documents. Merge them into one list that:
+    - Removes duplicate and overlapping questions
+    - Keeps the most important and common questions with clear and concise answers
+    - Is organized by topic
+    - Includes at least 10 questions and answers
+    
+    Format each FAQ as:
+    Q: [Question]
+    A: [Answer]
+    """),
+    ("user", "FAQs to merge: \n\n {partials}")
+])
+
+# Generation settings, also part of the result cache key
+FAQS_LLM = {"max_output_tokens": 1024, "temperature": 0.7}
 
-def generate_faqs() -> str:
+# Create the FAQs chain on the shared LLM client (built on first use)
+def get_faqs_chain():
+    """Return the FAQs chain."""
+    llm = get_chat_llm(**FAQS_LLM)
+    return faqs_prompt | llm | StrOutputParser()
+
+def generate_faqs(use_cache: bool = True, sources: SourceView | None = None) -> str:
     """
     Generate FAQs from all source documents.
     
+    Large corpora are processed per source and combined (map-reduce). Results
+    are cached per source content, prompt and model settings.
+    
+    Args:
+        use_cache: Return a cached result when available; False always regenerates
+        sources: Already read sources; read from the notebook if None
+    
     Returns:
         str: Generated FAQs
     """
     try:
-        logger.info("Reading source files")
-        content = read_source_files()
+        if sources is None:
+            logger.info("Reading source files")
+            sources = read_sources()
         
-        if not content:
+        if not sources:
             return "No source files found to generate FAQs."
         
+        if use_map_reduce(len(sources)):
+            logger.info(f"Generating FAQs with map-reduce over {len(sources.entries)} sources")
+            return map_reduce_generate("faqs", sources, faqs_map_prompt, faqs_reduce_prompt, FAQS_LLM, use_cache=use_cache)
+        
+        cache = get_tool_result_cache()
+        key = ToolResultCache.make_key("faqs", faqs_prompt, DEFAULT_CHAT_MODEL, FAQS_LLM, sources.fingerprint)
+        faqs = cache.get(key) if use_cache else None
+        if faqs is not None:
+            logger.info("Returning cached FAQs")
+            return faqs
+        
         logger.info("Generating FAQs")
         # Generate FAQs
-        faqs = faqs_chain.invoke({"source_content": content})
+        faqs = get_faqs_chain().invoke({"source_content": sources.text})
+        cache.put(key, "faqs", faqs)
         
         logger.info("FAQs generated successfully")
         return faqs
@@ -0,0 +1,112 @@
+from typing import List, Tuple
+import logging
+import os
+
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from src.tools.result_cache import ToolResultCache
+from src.utils.registry import get_chat_llm, get_tool_result_cache, DEFAULT_CHAT_MODEL
+
+logger = logging.getLogger(__name__)
+
+# "auto" switches to map-reduce above MAP_REDUCE_THRESHOLD_CHARS of source content
+TOOL_MODE = os.getenv("NOTEBOOKLM_TOOL_MODE", "auto").lower()
+MAP_REDUCE_THRESHOLD_CHARS = int(os.getenv("NOTEBOOKLM_MAP_REDUCE_THRESHOLD_CHARS", "400000"))
+# Largest input of a single map or reduce call (roughly 100k tokens)
+MAX_CALL_CHARS = 400_000
+
+
+def use_map_reduce(content_chars: int) -> bool:
+    """Return True when a tool should run in map-reduce mode for content of this length."""
+    if TOOL_MODE == "map_reduce":
+        return True
+    if TOOL_MODE == "single":
+        return False
+    return content_chars > MAP_REDUCE_THRESHOLD_CHARS
+
+
+def _split(text: str, max_chars: int) -> List[str]:
+    """Split text into pieces of at most max_chars, preferring paragraph breaks."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n\n", 0, max_chars)
+        cut = cut if cut > max_chars // 2 else max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def _run_cached(
+    tool: str,
+    prompt: ChatPromptTemplate,
+    variable: str,
+    inputs: List[str],
+    llm_params: dict,
+    use_cache: bool,
+    max_concurrency: int
+) -> List[str]:
+    """Run a prompt over several inputs in parallel, serving and storing results in the tool cache."""
+    cache = get_tool_result_cache()
+    keys = [ToolResultCache.make_key(tool, prompt, DEFAULT_CHAT_MODEL, llm_params, text) for text in inputs]
+    results = [cache.get(key) if use_cache else None for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        chain = prompt | get_chat_llm(**llm_params) | StrOutputParser()
+        outputs = chain.batch([{variable: inputs[i]} for i in missing], config={"max_concurrency": max_concurrency})
+        for i, output in zip(missing, outputs):
+            cache.put(keys[i], tool, output)
+            results[i] = output
+    logger.info(f"{tool}: {len(inputs) - len(missing)} cached, {len(missing)} generated")
+    return results
+
+
+def map_reduce_generate(
+    tool: str,
+    sources: List[Tuple[str, str]],
+    map_prompt: ChatPromptTemplate,
+    reduce_prompt: ChatPromptTemplate,
+    llm_params: dict,
+    use_cache: bool = True,
+    max_concurrency: int = 4
+) -> str:
+    """
+    Generate a tool result by mapping over sources and reducing the partial results.
+
+    The map step runs `map_prompt` (input variable `source_content`) on every
+    source in parallel; sources larger than one call are split first. Each
+    partial result is cached by the hash of its input, so adding a source only
+    maps the new source. The reduce step runs `reduce_prompt` (input variable
+    `partials`) over the partials, collapsing them in groups first if they do
+    not fit in one call.
+
+    Args:
+        tool: Tool name, used in cache keys and logs
+        sources: (source name, content) pairs in notebook order
+        map_prompt: Prompt producing a partial result for one source
+        reduce_prompt: Prompt combining partial results
+        llm_params: Generation settings of the chat model
+        use_cache: Reuse cached partial and final results
+        max_concurrency: Maximum parallel model calls
+
+    Returns:
+        str: The combined result
+    """
+    pieces = [piece for _, content in sources if content for piece in _split(content, MAX_CALL_CHARS)]
+    partials = _run_cached(f"{tool}:map", map_prompt, "source_content", pieces, llm_params, use_cache, max_concurrency)
+
+    while True:
+        groups, group, size = [], [], 0
+        for partial in partials:
+            if group and size + len(partial) > MAX_CALL_CHARS:
+                groups.append(group)
+                group, size = [], 0
+            group.append(partial)
+            size += len(partial) + 2
+        groups.append(group)
+        combined = ["\n\n".join(f"--- Part {i + 1} ---\n{partial}" for i, partial in enumerate(group)) for group in groups]
+        partials = _run_cached(f"{tool}:reduce", reduce_prompt, "partials", combined, llm_params, use_cache, max_concurrency)
+        if len(partials) == 1:
+            return partials[0]
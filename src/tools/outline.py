@@ -1,24 +1,18 @@
 import logging
-from typing import List
-from pathlib import Path
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from langchain_core.output_parsers import StrOutputParser
-import streamlit as st
 
-from src.utils.utils import read_source_files
+from src.utils.utils import read_sources
+from src.sources.source_reader import SourceView
+from src.utils.registry import get_chat_llm, get_tool_result_cache, DEFAULT_CHAT_MODEL
+from src.tools.result_cache import ToolResultCache
+from src.tools.map_reduce import map_reduce_generate, use_map_reduce
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize components
-llm = ChatVertexAI(
-    model="gemini-1.5-flash-002",
-    max_output_tokens=1024,
-    temperature=0.7,
-)
 
 # Create the outline prompt
 outline_prompt = ChatPromptTemplate.from_messages([
@@ -34,26 +28,72 @@ outline_prompt = ChatPromptTemplate.from_messages([
     
 ])
 
-# Create the outline chain
-outline_chain = outline_prompt | llm | StrOutputParser()
+# Map-reduce prompts for corpora too large for one call
+outline_map_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at creating structured outlines of complex documents.
+    Create a hierarchical outline (I, A, 1, a, etc.) of the provided part of a larger collection of documents,
+    with its main topics, subtopics and the logical flow of information.
+    """),
+    ("human", "Content to outline: \n\n {source_content}"),
+])
+
+outline_reduce_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are an expert at creating structured outlines of complex documents.
+    You are given outlines of the parts of a collection of documents. Merge them into one detailed outline that:
+    - Uses proper hierarchical structure (I, A, 1, a, etc.)
+    - Groups related topics from different parts together
+    - Captures the logical flow of information
+    - Is easy to follow and understand
+    """),
+    ("human", "Outlines to merge: \n\n {partials}"),
+])
+
+# Generation settings, also part of the result cache key
+OUTLINE_LLM = {"max_output_tokens": 1024, "temperature": 0.7}
 
-def generate_outline() -> str:
+# Create the outline chain on the shared LLM client (built on first use)
+def get_outline_chain():
+    """Return the outline chain."""
+    llm = get_chat_llm(**OUTLINE_LLM)
+    return outline_prompt | llm | StrOutputParser()
+
+def generate_outline(use_cache: bool = True, sources: SourceView | None = None) -> str:
     """
     Generate a hierarchical outline of all source documents.
     
+    Large corpora are processed per source and combined (map-reduce). Results
+    are cached per source content, prompt and model settings.
+    
+    Args:
+        use_cache: Return a cached result when available; False always regenerates
+        sources: Already read sources; read from the notebook if None
+    
     Returns:
         str: Generated outline
     """
     try:
-        logger.info("Reading source files")
-        content = read_source_files()
+        if sources is None:
+            logger.info("Reading source files")
+            sources = read_sources()
         
-        if not content:
+        if not sources:
             return "No source files found to create outline."
         
+        if use_map_reduce(len(sources)):
+            logger.info(f"Generating outline with map-reduce over {len(sources.entries)} sources")
+            return map_reduce_generate("outline", sources, outline_map_prompt, outline_reduce_prompt, OUTLINE_LLM, use_cache=use_cache)
+        
+        cache = get_tool_result_cache()
+        key = ToolResultCache.make_key("outline", outline_prompt, DEFAULT_CHAT_MODEL, OUTLINE_LLM, sources.fingerprint)
+        outline = cache.get(key) if use_cache else None
+        if outline is not None:
+            logger.info("Returning cached outline")
+            return outline
+        
         logger.info("Generating outline")
         # Generate outline
-        outline = outline_chain.invoke({"source_content": content})
+        outline = get_outline_chain().invoke({"source_content": sources.text})
+        cache.put(key, "outline", outline)
         
         logger.info("Outline generated successfully")
         return outline
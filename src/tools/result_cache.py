@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Optional
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from langchain_core.prompts import ChatPromptTemplate
+
+logger = logging.getLogger(__name__)
+
+
+def prompt_fingerprint(prompt: ChatPromptTemplate) -> str:
+    """Hash the templates of a prompt, so editing a prompt invalidates its cached results."""
+    templates = [
+        (message.__class__.__name__, getattr(getattr(message, "prompt", None), "template", repr(message)))
+        for message in prompt.messages
+    ]
+    return hashlib.sha256(json.dumps(templates).encode("utf-8")).hexdigest()[:16]
+
+
+def content_hash(content: str) -> str:
+    """Hash of the ordered source contents a tool result was generated from."""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """
+    Persistent cache of generated tool results (summary, FAQs, outline).
+
+    Results are stored in SQLite keyed on (tool, prompt fingerprint, model
+    configuration, source content hash), so a result is reused until the
+    prompt, the model settings or any source changes. Once the stored results
+    exceed `max_bytes`, the least recently used ones are evicted.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_path: Path of the SQLite file. If None, uses .cache/tool_results.sqlite
+            max_bytes: Size budget for the stored results
+        """
+        self.cache_path = Path(cache_path) if cache_path else Path(".cache/tool_results.sqlite")
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, tool TEXT NOT NULL, result TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+        self._conn.commit()
+        # Running size of the stored results, so inserts need not sum the table
+        self._bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    @staticmethod
+    def make_key(tool: str, prompt: ChatPromptTemplate, model: str, llm_params: dict, content: str) -> str:
+        """
+        Build the cache key of a tool run.
+
+        Args:
+            tool: Tool name
+            prompt: Prompt template the tool uses
+            model: Chat model name
+            llm_params: Generation settings (max output tokens, temperature)
+            content: Source content the tool runs on, or a fingerprint of it
+
+        Returns:
+            str: Cache key
+        """
+        parts = [tool, prompt_fingerprint(prompt), model, json.dumps(llm_params, sort_keys=True), content_hash(content)]
+        return hashlib.sha256("\x00".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a cached result, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return row[0]
+
+    def put(self, key: str, tool: str, result: str):
+        """Store a result and evict the least recently used results beyond the size budget."""
+        size = len(result.encode("utf-8"))
+        with self._lock:
+            replaced = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, tool, result, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, tool, result, size, time.time())
+            )
+            self._bytes += size - (replaced[0] if replaced else 0)
+            total = self._bytes
+            if total > self.max_bytes:
+                evicted = 0
+                for old_key, old_size in self._conn.execute(
+                    "SELECT key, size FROM results ORDER BY last_access"
+                ).fetchall():
+                    if total <= self.max_bytes * 0.9 or old_key == key:
+                        break
+                    self._conn.execute("DELETE FROM results WHERE key = ?", (old_key,))
+                    total -= old_size
+                    evicted += 1
+                self._bytes = total
+                logger.info(f"Evicted {evicted} tool results from cache")
+            self._conn.commit()
+
+    def get_stats(self) -> dict:
+        """Get statistics about the tool result cache."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": self._bytes}
+
+    def close(self):
+        """Close the SQLite connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,17 +1,15 @@
 import logging
-from typing import List
-from pathlib import Path
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from langchain_core.output_parsers import StrOutputParser
-import streamlit as st
-import vertexai
-import os
 import dotenv
 dotenv.load_dotenv()
 
-from src.utils.utils import read_source_files
+from src.utils.utils import read_sources
+from src.sources.source_reader import SourceView
+from src.utils.registry import get_chat_llm, get_tool_result_cache, DEFAULT_CHAT_MODEL
+from src.tools.result_cache import ToolResultCache
+from src.tools.map_reduce import map_reduce_generate, use_map_reduce
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,12 +17,6 @@ logger = logging.getLogger(__name__)
 
 
 
-# Initialize components
-llm = ChatVertexAI(
-    model="gemini-1.5-flash-002",
-    max_output_tokens=8096,
-    temperature=0.2,
-)
 
 # Create the summary prompt
 summary_prompt = ChatPromptTemplate.from_messages([
@@ -35,27 +27,70 @@ summary_prompt = ChatPromptTemplate.from_messages([
     ("user", """Summarize the following content: \n\n {source_content}""")
 ])
 
-# Create the summary chain
-summary_chain = summary_prompt | llm | StrOutputParser()
+# Map-reduce prompts for corpora too large for one call
+summary_map_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are a skilled summarizer. Summarize the provided part of a larger collection of documents.
+    Capture its main ideas, key points and important details so the summary can later be combined
+    with the summaries of the other parts.
+    """),
+    ("user", """Summarize the following content: \n\n {source_content}""")
+])
+
+summary_reduce_prompt = ChatPromptTemplate.from_messages([
+    ("system", """You are a skilled summarizer who can create concise, informative summaries of documents.
+    You are given summaries of the parts of a collection of documents. Combine them into one comprehensive
+    summary that captures the main ideas, key points, and important details.
+    The summary should be well-structured and easy to understand.
+    """),
+    ("user", """Combine the following summaries: \n\n {partials}""")
+])
+
+# Generation settings, also part of the result cache key
+SUMMARY_LLM = {"max_output_tokens": 8096, "temperature": 0.2}
 
-def generate_summary() -> str:
+# Create the summary chain on the shared LLM client (built on first use)
+def get_summary_chain():
+    """Return the summary chain."""
+    llm = get_chat_llm(**SUMMARY_LLM)
+    return summary_prompt | llm | StrOutputParser()
+
+def generate_summary(use_cache: bool = True, sources: SourceView | None = None) -> str:
     """
     Generate a summary of all source documents.
     
+    Large corpora are processed per source and combined (map-reduce). Results
+    are cached per source content, prompt and model settings.
+    
+    Args:
+        use_cache: Return a cached result when available; False always regenerates
+        sources: Already read sources; read from the notebook if None
+    
     Returns:
         str: Generated summary
     """
     try:
-        logger.info("Reading source files")
-        content = read_source_files()
-        logger.debug(f"Content: {content}")
+        if sources is None:
+            logger.info("Reading source files")
+            sources = read_sources()
         
-        if not content:
+        if not sources:
             return "No source files found to summarize."
         
+        if use_map_reduce(len(sources)):
+            logger.info(f"Generating summary with map-reduce over {len(sources.entries)} sources")
+            return map_reduce_generate("summary", sources, summary_map_prompt, summary_reduce_prompt, SUMMARY_LLM, use_cache=use_cache)
+        
+        cache = get_tool_result_cache()
+        key = ToolResultCache.make_key("summary", summary_prompt, DEFAULT_CHAT_MODEL, SUMMARY_LLM, sources.fingerprint)
+        summary = cache.get(key) if use_cache else None
+        if summary is not None:
+            logger.info("Returning cached summary")
+            return summary
+        
         logger.info("Generating summary")
         # Generate summary
-        summary = summary_chain.invoke({"source_content": content})
+        summary = get_summary_chain().invoke({"source_content": sources.text})
+        cache.put(key, "summary", summary)
         
         logger.info("Summary generated successfully")
         return summary
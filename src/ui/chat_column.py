@@ -1,11 +1,16 @@
 import streamlit as st
 import logging
-from src.chat.chat import chat_response
+from src.utils.utils import get_notebook_collection, get_active_source_ids
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _prepend(first, rest):
+    """Yield an already consumed first item followed by the rest of an iterator."""
+    yield first
+    yield from rest
+
 def render_chat_column():
     """Render the chat column with message history and input."""
     st.header("Chat")
@@ -40,28 +45,32 @@ def render_chat_column():
                 "content": prompt
             })
             
-            # Show typing indicator
+            # Stream the response into the assistant message as it is generated
             with messages_container:
                 with st.chat_message("assistant"):
-                    with st.spinner("Thinking..."):
-                        try:
-                            # Get response from RAG agent
-                            response = chat_response(prompt, st.session_state.chat_messages[:-1])
-                            logger.info("Got response from chat agent")
-                        except Exception as e:
-                            logger.error(f"Error getting chat response: {str(e)}")
-                            raise
+                    try:
+                        # Get response from RAG agent (imported on first message)
+                        from src.chat.chat import chat_response_stream
+                        with st.spinner("Thinking..."):
+                            tokens = chat_response_stream(
+                                prompt,
+                                st.session_state.chat_messages[:-1],
+                                collection_name=get_notebook_collection(),
+                                source_ids=get_active_source_ids()
+                            )
+                            # Retrieval happens before the first token, so keep the spinner until then
+                            first_token = next(tokens, "")
+                        response = st.write_stream(_prepend(first_token, tokens))
+                        logger.info("Got response from chat agent")
+                    except Exception as e:
+                        logger.error(f"Error getting chat response: {str(e)}")
+                        raise
             
             # Add AI response to session state
             st.session_state.chat_messages.append({
                 "role": "assistant",
                 "content": response
             })
-            
-            # Display assistant response
-            with messages_container:
-                with st.chat_message("assistant"):
-                    st.write(response)
                     
         except Exception as e:
             error_msg = f"Error: {str(e)}"
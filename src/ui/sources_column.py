@@ -3,7 +3,8 @@ from pathlib import Path
 import mimetypes
 from typing import Optional
 
-from src.sources.doc_parser import DocumentParser
+from src.sources.parse_store import hash_stream
+from src.utils.utils import get_notebook_collection
 
 def is_supported_file(file_path: str) -> bool:
     """Check if the file type is supported by the parser."""
@@ -15,21 +16,29 @@ def is_supported_file(file_path: str) -> bool:
         ]
     return False
 
+def get_doc_parser():
+    """Return the session's document parser, importing the parsing/indexing stack on first use."""
+    if 'doc_parser' not in st.session_state:
+        from src.sources.doc_parser import DocumentParser
+        st.session_state.doc_parser = DocumentParser(collection_name=get_notebook_collection())
+    return st.session_state.doc_parser
+
 def handle_file_upload(uploaded_file, upload_dir: Path = Path(".cache/uploaded_docs")) -> Optional[str]:
     """Handle file upload and return the parsed file path if successful."""
     if uploaded_file is None:
         return None
         
-    # Save uploaded file to temp location
-    upload_dir.mkdir(exist_ok=True)
+    # Stream uploaded file to temp location, hashing it on the way
+    upload_dir.mkdir(parents=True, exist_ok=True)
     file_upload_path = upload_dir / uploaded_file.name
     
+    uploaded_file.seek(0)
     with open(file_upload_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        content_hash = hash_stream(uploaded_file, sink=f)
     
     if is_supported_file(str(file_upload_path)):
-        # Parse the file
-        parsed_path = st.session_state.doc_parser.parse_file(str(file_upload_path))
+        # Parse the file (returns immediately if this content was parsed before)
+        parsed_path = get_doc_parser().parse_file(str(file_upload_path), content_hash=content_hash)
         return parsed_path
     else:
         st.error(f"Unsupported file type: {uploaded_file.name}")
@@ -47,14 +56,14 @@ def render_sources_column():
     """Render the sources column with source management functionality."""
     st.header("Sources")
     
-    # Initialize document parser
-    if 'doc_parser' not in st.session_state:
-        st.session_state.doc_parser = DocumentParser()
-    
     # Initialize sources list if not exists
     if 'sources' not in st.session_state:
         st.session_state.sources = []
     
+    # Map of source path -> source ID it was indexed under
+    if 'source_ids' not in st.session_state:
+        st.session_state.source_ids = {}
+    
     # Initialize file processing flag
     if 'file_processed' not in st.session_state:
         st.session_state.file_processed = False
@@ -77,8 +86,19 @@ def render_sources_column():
         if uploaded_file and not st.session_state.file_processed:
             with st.spinner(f"Processing {uploaded_file.name}... This may take a moment."):
                 parsed_path = handle_file_upload(uploaded_file)
-                if parsed_path and parsed_path not in st.session_state.sources:
+                if parsed_path and parsed_path in st.session_state.sources:
+                    existing_name = st.session_state.source_ids.get(parsed_path, uploaded_file.name)
+                    renamed = f" as {existing_name}" if existing_name != uploaded_file.name else ""
+                    st.info(f"{uploaded_file.name} is already in this notebook{renamed}")
+                    st.session_state.file_processed = True
+                elif parsed_path:
+                    # A re-upload of a changed file was re-indexed in place; replace its old version
+                    st.session_state.sources = [
+                        source for source in st.session_state.sources
+                        if st.session_state.source_ids.get(source) != uploaded_file.name
+                    ]
                     st.session_state.sources.append(parsed_path)
+                    st.session_state.source_ids[parsed_path] = uploaded_file.name
                     st.success(f"File processed and added: {uploaded_file.name}")
                     st.session_state.file_processed = True
                     st.rerun()
@@ -111,7 +131,11 @@ def render_sources_column():
                 st.text(str(source))
             with col2:
                 if st.button("Remove", key=f"remove_{i}"):
-                    st.session_state.sources.pop(i)
+                    removed = st.session_state.sources.pop(i)
+                    # Drop the source's chunks so they stop showing up in retrieval
+                    source_id = st.session_state.source_ids.pop(removed, None)
+                    if source_id:
+                        get_doc_parser().remove_source(source_id)
                     st.rerun()
     else:
         st.info("No sources added yet. Add some sources to get started!")
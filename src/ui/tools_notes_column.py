@@ -1,13 +1,15 @@
 import streamlit as st
+import streamlit.components.v1 as components
 from datetime import datetime
+import base64
+import json
 import os
+import uuid
 from pathlib import Path
 
-from src.tools.summary import generate_summary
-from src.tools.faqs import generate_faqs
-from src.tools.outline import generate_outline
-from src.podcast.synthesize_speech import create_podcast_audio
-from src.sources.vectordb_ingestion import VectorDBIngestion
+# Tool and podcast modules pull in the LLM/TTS stacks, so they are imported on first use
+from src.utils.registry import get_ingestion, hold_collection
+from src.utils.utils import get_notebook_collection
 
 def render_tools_section():
     """Render the tools section with action buttons."""
@@ -27,6 +29,7 @@ def render_tools_section():
     with col1:
         if st.button("Summary"):
             with st.spinner("Generating summary..."):
+                from src.tools.summary import generate_summary
                 note = generate_summary()
                 st.session_state.notes.append({
                     "type": "summary",
@@ -38,6 +41,7 @@ def render_tools_section():
     with col2:
         if st.button("FAQs"):
             with st.spinner("Generating FAQs..."):
+                from src.tools.faqs import generate_faqs
                 note = generate_faqs()
                 st.session_state.notes.append({
                     "type": "faqs",
@@ -49,6 +53,7 @@ def render_tools_section():
     with col3:
         if st.button("Outline"):
             with st.spinner("Generating outline..."):
+                from src.tools.outline import generate_outline
                 note = generate_outline()
                 st.session_state.notes.append({
                     "type": "outline",
@@ -57,6 +62,44 @@ def render_tools_section():
                 })
                 st.rerun()
 
+    # Run several tools at once over a single read of the sources
+    from src.tools.batch import TOOL_LABELS
+    selected_tools = st.multiselect(
+        "Tools to generate together",
+        options=list(TOOL_LABELS),
+        default=["summary", "faqs", "outline"],
+        format_func=TOOL_LABELS.get
+    )
+    if st.button("Generate all") and selected_tools:
+        from src.tools.batch import run_tools
+        progress = st.progress(0.0, text="Generating notes...")
+        status_lines = {name: st.empty() for name in selected_tools}
+        finished = []
+
+        def on_progress(name, status, elapsed):
+            if status == "running":
+                status_lines[name].caption(f"{TOOL_LABELS[name]}: running...")
+                return
+            finished.append(name)
+            status_lines[name].caption(f"{TOOL_LABELS[name]}: {status} in {elapsed:.1f}s")
+            progress.progress(len(finished) / len(selected_tools), text=f"{len(finished)}/{len(selected_tools)} done")
+
+        results = run_tools(selected_tools, on_progress=on_progress, podcast_settings=st.session_state.podcast_settings)
+        failed = []
+        for name in selected_tools:
+            if isinstance(results[name], Exception):
+                failed.append(f"{TOOL_LABELS[name]}: {str(results[name])}")
+                continue
+            st.session_state.notes.append({
+                "type": name.replace("_", " "),
+                "content": results[name],
+                "timestamp": datetime.now()
+            })
+        if failed:
+            st.error("Some tools failed:\n\n" + "\n\n".join(failed))
+        else:
+            st.rerun()
+
     # Add Podcast button with settings expander
     with st.expander("Podcast Settings"):
         st.session_state.podcast_settings['n_participants'] = st.slider(
@@ -82,30 +125,87 @@ def render_tools_section():
             step=5
         )
     
+    # Set when this run already shows the podcast as parts, so the full player is not repeated below them
+    parts_shown = False
     if st.button("Generate Podcast"):
-        with st.spinner("Generating podcast... This may take a few minutes."):
+        # One player starts with the first part and chains each later part as it is written,
+        # so the podcast plays through while later segments are still being synthesized
+        progress_caption = st.empty()
+        parts_container = st.container()
+        run_id = uuid.uuid4().hex
+
+        def on_part(part):
+            nonlocal parts_shown
+            progress_caption.caption(f"{part.segments_done} segments ready ({part.duration:.0f}s in the latest part)...")
+            with parts_container:
+                if not parts_shown:
+                    render_podcast_player(run_id)
+                    parts_shown = True
+                queue_podcast_part(run_id, part.index, part.path)
+
+        with st.spinner("Generating podcast... Playback starts after the first segments."):
             try:
+                from src.podcast.synthesize_speech import create_podcast_audio
+                
                 # Generate the podcast
                 podcast_path = create_podcast_audio(
                     n_participants=st.session_state.podcast_settings['n_participants'],
                     target_audience=st.session_state.podcast_settings['target_audience'],
-                    duration_mins=st.session_state.podcast_settings['duration_mins']
+                    duration_mins=st.session_state.podcast_settings['duration_mins'],
+                    on_part=on_part
                 )
                 
-                # Store the path in session state
+                # Store the path in session state; no rerun, so parts already playing are not interrupted
                 st.session_state.podcast_settings['last_podcast'] = podcast_path
+                progress_caption.empty()
                 st.success("Podcast generated successfully!")
-                st.rerun()
             except Exception as e:
                 st.error(f"Error generating podcast: {str(e)}")
     
     # Display audio player if podcast exists
-    if st.session_state.podcast_settings['last_podcast']:
+    if st.session_state.podcast_settings['last_podcast'] and not parts_shown:
         podcast_path = st.session_state.podcast_settings['last_podcast']
         if os.path.exists(podcast_path):
             st.subheader("Generated Podcast")
-            with open(podcast_path, 'rb') as audio_file:
-                st.audio(audio_file.read(), format='audio/mp3')
+            st.audio(podcast_path, format='audio/mp3')
+
+def render_podcast_player(run_id: str):
+    """Render a player that plays the parts queued for a podcast run back to back."""
+    components.html(f"""
+        <audio id="player" controls autoplay style="width: 100%"></audio>
+        <script>
+            const page = window.parent;
+            const run = {json.dumps(run_id)};
+            // Keep only this run's parts on the page
+            page.podcastParts = {{[run]: (page.podcastParts || {{}})[run] || []}};
+            const audio = document.getElementById("player");
+            let next = 0;
+            function playNext() {{
+                const parts = page.podcastParts[run] || [];
+                if (parts[next] && (!audio.src || audio.ended)) {{
+                    audio.src = parts[next];
+                    if (next > 0) delete parts[next - 1];
+                    next += 1;
+                    audio.play();
+                }}
+            }}
+            audio.addEventListener("ended", playNext);
+            setInterval(playNext, 500);
+        </script>
+    """, height=60)
+
+def queue_podcast_part(run_id: str, index: int, part_path: str):
+    """Hand a written podcast part to the player of its run."""
+    data = base64.b64encode(Path(part_path).read_bytes()).decode("ascii")
+    components.html(f"""
+        <script>
+            const page = window.parent;
+            const run = {json.dumps(run_id)};
+            page.podcastParts = page.podcastParts || {{}};
+            // Parts may load out of order, so each goes to its own slot
+            (page.podcastParts[run] = page.podcastParts[run] || [])[{index}] = "data:audio/mpeg;base64,{data}";
+        </script>
+    """, height=0)
 
 def save_notes_to_markdown():
     """Save all notes to a markdown file and return the file path."""
@@ -159,12 +259,14 @@ def render_notes_section():
                     # Save notes to markdown file
                     notes_file = save_notes_to_markdown()
                     if notes_file and notes_file not in st.session_state.sources:
-                        # Index the notes in vector database
-                        vectordb = VectorDBIngestion()
-                        vectordb.process_document(notes_file, source_id=Path(notes_file).name)
+                        # Index the notes in vector database (shared ingestion handler)
+                        collection_name = get_notebook_collection()
+                        with hold_collection(collection_name):
+                            get_ingestion(collection_name).process_document(notes_file, source_id=Path(notes_file).name)
                         
                         # Add to sources
                         st.session_state.sources.append(notes_file)
+                        st.session_state.source_ids[notes_file] = Path(notes_file).name
                         st.success(f"Notes saved and indexed successfully")
                         st.rerun()
             else:
@@ -0,0 +1,172 @@
+from pathlib import Path
+from typing import List, Optional
+from array import array
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys: NFC unicode form and collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Disk-backed embedding cache that wraps another Embeddings implementation.
+
+    Vectors are stored in SQLite keyed on (model name, task, normalized text hash),
+    so identical chunks and repeated queries are embedded once. Documents and
+    queries are cached separately because Vertex embeds them with different
+    task types. The least recently used entries are evicted once the cache
+    holds more than `max_entries` vectors.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        cache_path: Optional[str] = None,
+        max_entries: int = 200_000
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            embeddings: The underlying embeddings to call on cache misses
+            model_name: Name of the embedding model, part of every cache key
+            cache_path: Path of the SQLite file. If None, uses .cache/embeddings.sqlite
+            max_entries: Maximum number of cached vectors before LRU eviction
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.cache_path = Path(cache_path) if cache_path else Path(".cache/embeddings.sqlite")
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON embeddings(last_access)")
+        self._conn.commit()
+        # Running entry count, so inserts need not count the table
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of texts served from the cache since this instance was created."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get_stats(self) -> dict:
+        """Get statistics about the embedding cache."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate,
+                "entries": self._count,
+            }
+
+    def _key(self, task: str, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{task}:{digest}"
+
+    def _lookup(self, keys: List[str]) -> dict:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+        return found
+
+    def _record(self, hits: int = 0, misses: int = 0):
+        # Several embedding threads share the counters
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _store(self, items: dict):
+        now = time.time()
+        with self._lock:
+            # A key stored concurrently by another thread already holds the same vector
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+            ).rowcount
+            self._count += inserted
+            if self._count > self.max_entries:
+                # Evict down to 90% of the budget so eviction does not run on every insert
+                excess = self._count - int(self.max_entries * 0.9)
+                evicted = self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_access LIMIT ?)", (excess,)
+                ).rowcount
+                self._count -= evicted
+                logger.info(f"Evicted {evicted} entries from embedding cache")
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, calling the wrapped embeddings only for uncached texts."""
+        keys = [self._key("document", text) for text in texts]
+        found = self._lookup(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        self._record(hits=len(texts) - len(missing), misses=len(missing))
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._store(computed)
+            found.update(computed)
+
+        logger.info(f"Embedded {len(texts)} documents ({len(missing)} misses, hit rate {self.hit_rate:.1%})")
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, serving repeated queries from the cache."""
+        key = self._key("query", text)
+        found = self._lookup([key])
+        if key in found:
+            self._record(hits=1)
+            return found[key]
+
+        self._record(misses=1)
+        vector = self.embeddings.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def close(self):
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
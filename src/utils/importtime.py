@@ -0,0 +1,91 @@
+from typing import Dict, Iterable
+import logging
+import subprocess
+import sys
+
+logger = logging.getLogger(__name__)
+
+# Cold-start budget for the app's import graph: importing the UI package must not
+# pull in any of these stacks, which are loaded the first time a feature is used.
+DEFERRED_MODULES = (
+    "langchain",
+    "langchain_core",
+    "langchain_google_vertexai",
+    "langgraph",
+    "chromadb",
+    "google.cloud.texttospeech",
+    "pydub",
+    "pypdf",
+    "docx",
+)
+
+# Cumulative import time budgets in seconds, excluding streamlit itself
+IMPORT_TIME_BUDGETS = {
+    "src.ui": 0.15,
+}
+
+
+def measure_imports(module: str) -> Dict[str, float]:
+    """
+    Import a module in a fresh interpreter with `python -X importtime`.
+
+    Args:
+        module: Dotted module name to import
+
+    Returns:
+        Dict[str, float]: Cumulative import time in seconds of every module imported
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative) / 1e6
+    return timings
+
+
+def check_import_budget(
+    module: str,
+    budget: float,
+    deferred: Iterable[str] = DEFERRED_MODULES,
+    exclude: str = "streamlit"
+) -> list[str]:
+    """
+    Check that importing a module stays within its cold-start budget.
+
+    Args:
+        module: Dotted module name to import
+        budget: Maximum cumulative import time in seconds, not counting `exclude`
+        deferred: Top-level packages that must not be imported eagerly
+        exclude: Top-level package whose import time is not counted
+
+    Returns:
+        list[str]: Budget violations; empty if the module is within budget
+    """
+    timings = measure_imports(module)
+    violations = [
+        f"{module} eagerly imports {name}"
+        for name in deferred
+        if name in timings
+    ]
+    elapsed = timings.get(module, 0.0) - timings.get(exclude, 0.0)
+    if elapsed > budget:
+        violations.append(f"{module} imports in {elapsed:.3f}s (budget {budget:.3f}s)")
+    return violations
+
+
+if __name__ == "__main__":
+    # Usage: python -m src.utils.importtime
+    failures = []
+    for module, budget in IMPORT_TIME_BUDGETS.items():
+        failures.extend(check_import_budget(module, budget))
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,307 @@
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+import atexit
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHAT_MODEL = "gemini-1.5-flash-002"
+DEFAULT_EMBEDDING_MODEL = "text-embedding-005"
+DEFAULT_VECTORDB_DIR = ".cache/vectordb"
+DEFAULT_LEXICAL_DIR = ".cache/lexical"
+DEFAULT_MMAP_VECTORDB_DIR = ".cache/mmap_vectordb"
+
+# Vector store backend: "chroma" (default) or "mmap" for the memory-mapped int8 store
+VECTOR_BACKEND = os.getenv("NOTEBOOKLM_VECTOR_BACKEND", "chroma").lower()
+
+# Per-collection resources (ingestion, vector store, BM25 index) kept open at once, and the
+# idle time after which a collection's resources are closed
+MAX_OPEN_COLLECTIONS = int(os.getenv("NOTEBOOKLM_MAX_OPEN_COLLECTIONS", "32"))
+COLLECTION_IDLE_SECONDS = float(os.getenv("NOTEBOOKLM_COLLECTION_IDLE_SECONDS", "3600"))
+
+
+class ResourceRegistry:
+    """
+    Process-wide registry of shared clients (LLMs, embeddings, Chroma, TTS).
+
+    Each resource is created lazily on first use, once per configuration key,
+    and then shared by every Streamlit session and rerun in the process.
+    Creation is serialized per key, so concurrent first uses build a resource
+    only once without blocking unrelated lookups.
+
+    Resources may belong to a scope, such as a notebook's collection. Scopes
+    not used for `scope_idle_seconds`, and the least recently used ones beyond
+    `max_scopes`, are evicted: their resources are closed and dropped, and are
+    created again on their next use. A scope is never evicted while it is held
+    with `hold`, so callers hold a scope around looking up and using its
+    resources.
+    """
+
+    def __init__(self, max_scopes: int = MAX_OPEN_COLLECTIONS, scope_idle_seconds: float = COLLECTION_IDLE_SECONDS):
+        self._resources: Dict[Hashable, Any] = {}
+        self._closers: Dict[Hashable, Callable[[Any], None]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = defaultdict(threading.Lock)
+        self.max_scopes = max_scopes
+        self.scope_idle_seconds = scope_idle_seconds
+        # Scope -> last use, least recently used first
+        self._scope_used: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._scope_keys: Dict[Hashable, list] = defaultdict(list)
+        # Scope -> number of callers currently using its resources
+        self._holders: Dict[Hashable, int] = defaultdict(int)
+
+    def get(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        close: Optional[Callable[[Any], None]] = None,
+        scope: Optional[Hashable] = None
+    ) -> Any:
+        """
+        Return the resource for a key, creating it with `factory` on first use.
+
+        Args:
+            key: Hashable configuration key, e.g. ("llm", model, temperature)
+            factory: Zero-argument callable that builds the resource
+            close: Optional callable that releases the resource on shutdown or eviction
+            scope: Optional scope the resource is evicted with, e.g. ("collection", name)
+
+        Returns:
+            Any: The shared resource
+        """
+        resource = self._resources.get(key)
+        if resource is not None:
+            if scope is not None:
+                self._touch(scope)
+            return resource
+
+        with self._lock:
+            key_lock = self._key_locks[key]
+        with key_lock:
+            resource = self._resources.get(key)
+            if resource is None:
+                logger.info(f"Creating shared resource {key}")
+                resource = factory()
+                with self._lock:
+                    self._resources[key] = resource
+                    if close is not None:
+                        self._closers[key] = close
+                    if scope is not None:
+                        self._scope_keys[scope].append(key)
+        if scope is not None:
+            self._touch(scope)
+        return resource
+
+    @contextmanager
+    def hold(self, scope: Hashable) -> Iterator[None]:
+        """Keep a scope's resources open until the block exits."""
+        with self._lock:
+            self._holders[scope] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holders[scope] -= 1
+                if not self._holders[scope]:
+                    del self._holders[scope]
+
+    def _touch(self, scope: Hashable):
+        """Mark a scope as used and evict idle and least recently used scopes."""
+        now = time.monotonic()
+        with self._lock:
+            self._scope_used[scope] = now
+            self._scope_used.move_to_end(scope)
+            evicted = []
+            for old_scope, used in list(self._scope_used.items()):
+                over_limit = len(self._scope_used) > self.max_scopes
+                if old_scope == scope or (not over_limit and now - used < self.scope_idle_seconds):
+                    continue
+                if old_scope in self._holders:
+                    # In use; evicted by a later touch once released
+                    continue
+                del self._scope_used[old_scope]
+                for key in self._scope_keys.pop(old_scope, []):
+                    key_lock = self._key_locks.get(key)
+                    if key_lock is not None and not key_lock.locked():
+                        del self._key_locks[key]
+                    if key in self._resources:
+                        evicted.append((key, self._resources.pop(key), self._closers.pop(key, None)))
+        # Close outside the lock, most recently created first, as shutdown does
+        for key, resource, close in reversed(evicted):
+            logger.info(f"Evicting shared resource {key}")
+            if close is not None:
+                try:
+                    close(resource)
+                except Exception as e:
+                    logger.error(f"Error closing resource {key}: {str(e)}")
+
+    def shutdown(self):
+        """Release all resources, most recently created first."""
+        with self._lock:
+            items = list(self._resources.items())
+            closers = dict(self._closers)
+            self._resources.clear()
+            self._closers.clear()
+            self._scope_used.clear()
+            self._scope_keys.clear()
+            self._key_locks.clear()
+        for key, resource in reversed(items):
+            if key in closers:
+                try:
+                    closers[key](resource)
+                except Exception as e:
+                    logger.error(f"Error closing resource {key}: {str(e)}")
+
+
+registry = ResourceRegistry()
+atexit.register(registry.shutdown)
+
+
+def get_chat_llm(model: str = DEFAULT_CHAT_MODEL, max_output_tokens: int = 1024, temperature: float = 0.0):
+    """Return the shared ChatVertexAI client for a model configuration."""
+    def factory():
+        from langchain_google_vertexai import ChatVertexAI
+        return ChatVertexAI(model=model, max_output_tokens=max_output_tokens, temperature=temperature)
+    return registry.get(("chat_llm", model, max_output_tokens, temperature), factory)
+
+
+def get_embeddings(model_name: str = DEFAULT_EMBEDDING_MODEL):
+    """Return the shared, disk-cached Vertex embeddings for a model."""
+    def factory():
+        from langchain_google_vertexai import VertexAIEmbeddings
+        from src.utils.embedding_cache import CachedEmbeddings
+        return CachedEmbeddings(VertexAIEmbeddings(model_name=model_name), model_name=model_name)
+    return registry.get(("embeddings", model_name), factory, close=lambda embeddings: embeddings.close())
+
+
+def get_chroma_client(persist_dir: str = DEFAULT_VECTORDB_DIR):
+    """Return the shared persistent Chroma client for a directory."""
+    def factory():
+        import chromadb
+        Path(persist_dir).mkdir(parents=True, exist_ok=True)
+        return chromadb.PersistentClient(path=str(persist_dir))
+    return registry.get(("chroma_client", str(persist_dir)), factory)
+
+
+def get_vectorstore(
+    collection_name: str = "document_chunks",
+    persist_dir: str = DEFAULT_VECTORDB_DIR,
+    backend: Optional[str] = None
+):
+    """
+    Return the shared LangChain vector store for a collection.
+
+    Args:
+        collection_name: Name of the collection
+        persist_dir: Directory of the Chroma database
+        backend: "chroma" or "mmap"; defaults to VECTOR_BACKEND
+
+    Returns:
+        VectorStore: Chroma store, or MmapVectorStore under .cache/mmap_vectordb
+    """
+    backend = backend or VECTOR_BACKEND
+    if backend not in ("chroma", "mmap"):
+        raise ValueError(f"Unknown vector store backend: {backend}")
+
+    def factory():
+        if backend == "mmap":
+            from src.sources.mmap_store import MmapVectorStore
+            return MmapVectorStore(
+                str(Path(DEFAULT_MMAP_VECTORDB_DIR) / collection_name),
+                embedding_function=get_embeddings()
+            )
+        from langchain_chroma import Chroma
+        return Chroma(
+            client=get_chroma_client(persist_dir),
+            collection_name=collection_name,
+            embedding_function=get_embeddings()
+        )
+    close = (lambda store: store.close()) if backend == "mmap" else None
+    return registry.get(
+        ("vectorstore", backend, collection_name, str(persist_dir)), factory, close=close, scope=("collection", collection_name)
+    )
+
+
+def get_lexical_index(collection_name: str = "document_chunks", index_dir: str = DEFAULT_LEXICAL_DIR):
+    """Return the shared BM25 index maintained next to a collection."""
+    def factory():
+        from src.sources.lexical_index import BM25Index
+        return BM25Index(str(Path(index_dir) / f"{collection_name}.sqlite"))
+    return registry.get(
+        ("lexical_index", collection_name, str(index_dir)), factory,
+        close=lambda index: index.close(), scope=("collection", collection_name)
+    )
+
+
+def get_ingestion(collection_name: str = "document_chunks", persist_dir: str = DEFAULT_VECTORDB_DIR):
+    """
+    Return the shared VectorDBIngestion for a collection.
+
+    Per-collection resources are evicted once idle, so callers should look the
+    ingestion up for each use rather than keep it, inside `hold_collection`.
+    """
+    def factory():
+        from src.sources.vectordb_ingestion import VectorDBIngestion
+        return VectorDBIngestion(persist_dir=persist_dir, collection_name=collection_name)
+    return registry.get(
+        ("ingestion", collection_name, str(persist_dir)), factory,
+        close=lambda ingestion: ingestion.close(), scope=("collection", collection_name)
+    )
+
+
+def hold_collection(collection_name: str = "document_chunks"):
+    """Keep a collection's ingestion, vector store and BM25 index open while in use."""
+    return registry.hold(("collection", collection_name))
+
+
+def get_tts_client():
+    """Return the shared Google Cloud Text-to-Speech client."""
+    def factory():
+        from google.cloud import texttospeech
+        return texttospeech.TextToSpeechClient()
+    return registry.get(("tts_client",), factory, close=lambda client: client.transport.close())
+
+
+def get_query_cache():
+    """Return the shared chat query cache."""
+    def factory():
+        from src.chat.query_cache import QueryCache
+        return QueryCache(answer_cache=os.getenv("NOTEBOOKLM_ANSWER_CACHE", "1") != "0")
+    return registry.get(("query_cache",), factory)
+
+
+def get_history_manager():
+    """Return the shared chat history manager and its summary cache."""
+    def factory():
+        from src.chat.history import HistoryManager
+        return HistoryManager(prompt_token_budget=int(os.getenv("NOTEBOOKLM_CHAT_TOKEN_BUDGET", "8000")))
+    return registry.get(("history_manager",), factory)
+
+
+def get_tool_result_cache():
+    """Return the shared persistent cache of summary, FAQ and outline results."""
+    def factory():
+        from src.tools.result_cache import ToolResultCache
+        return ToolResultCache()
+    return registry.get(("tool_result_cache",), factory, close=lambda cache: cache.close())
+
+
+def get_source_reader():
+    """Return the shared mtime-aware source content cache."""
+    def factory():
+        from src.sources.source_reader import SourceReader
+        return SourceReader()
+    return registry.get(("source_reader",), factory)
+
+
+def get_tts_segment_cache():
+    """Return the shared content-addressed cache of synthesized speech segments."""
+    def factory():
+        from src.podcast.segment_cache import SegmentCache
+        return SegmentCache()
+    return registry.get(("tts_segment_cache",), factory, close=lambda cache: cache.close())
@@ -1,24 +1,53 @@
 import streamlit as st
 from pathlib import Path
+import re
+import uuid
+
+from src.utils.registry import get_source_reader
+
+def get_notebook_collection() -> str:
+    """
+    Return the vector store collection name of the current notebook.
+    
+    The notebook ID is kept in the `notebook` query parameter so reloading the
+    page reopens the same collection.
+    
+    Returns:
+        str: Collection name for the current session's notebook
+    """
+    if 'notebook_id' not in st.session_state:
+        notebook_id = st.query_params.get("notebook", "")
+        if not re.fullmatch(r"[0-9a-f]{16}", notebook_id):
+            notebook_id = uuid.uuid4().hex[:16]
+        st.session_state.notebook_id = notebook_id
+        st.query_params["notebook"] = st.session_state.notebook_id
+    return f"notebook_{st.session_state.notebook_id}"
+
+def get_active_source_ids() -> list[str]:
+    """Return the IDs under which the notebook's current sources are indexed."""
+    source_ids = st.session_state.get('source_ids', {})
+    return [source_ids[source] for source in st.session_state.get('sources', []) if source in source_ids]
+
+def read_sources():
+    """
+    Read the content of every source in the sources list.
+    
+    Files are served from a cache keyed on path, modification time and size, and
+    URL sources are downloaded by their own loader.
+    
+    Returns:
+        SourceView: Lazily concatenated (source, content) view in notebook order
+    """
+    view, errors = get_source_reader().read(list(st.session_state.get('sources', [])))
+    for source, e in errors:
+        st.error(f"Error reading source file {source}: {str(e)}")
+    return view
 
 def read_source_files() -> str:
     """
-    Read and combine content from all markdown files in the sources list.
+    Read and combine content from all sources in the sources list.
     
     Returns:
         str: Combined content from all source files
     """
-    if 'sources' not in st.session_state:
-        return ""
-        
-    content_parts = []
-    
-    for source in st.session_state.sources:
-        try:
-            with open(source, 'r') as f:
-                content_parts.append(f.read())
-        except Exception as e:
-            st.error(f"Error reading source file {source}: {str(e)}")
-            continue
-            
-    return "\n\n".join(content_parts)
+    return read_sources().text
@@ -0,0 +1,48 @@
+from typing import Sequence
+import importlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Modules that are imported on first use of a feature; warming them up moves
+# that cost off the first click.
+HEAVY_MODULES = (
+    "src.chat.chat",
+    "src.sources.doc_parser",
+    "src.tools.summary",
+    "src.tools.faqs",
+    "src.tools.outline",
+    "src.podcast.synthesize_speech",
+)
+
+_started = False
+_lock = threading.Lock()
+
+
+def _warm_up(modules: Sequence[str]):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.error(f"Error warming up {module}: {str(e)}")
+    logger.info(f"Warmed up {len(modules)} modules")
+
+
+def start_warmup(modules: Sequence[str] = HEAVY_MODULES) -> bool:
+    """
+    Import heavy feature modules on a background daemon thread, once per process.
+
+    Args:
+        modules: Dotted module names to import
+
+    Returns:
+        bool: True if this call started the warm-up thread
+    """
+    global _started
+    with _lock:
+        if _started:
+            return False
+        _started = True
+    threading.Thread(target=_warm_up, args=(tuple(modules),), name="warmup", daemon=True).start()
+    return True
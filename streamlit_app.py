@@ -1,6 +1,13 @@
+import os
 import streamlit as st
 from src.ui import render_sources_column, render_chat_column, render_tools_notes_column
 
+# Optionally import the heavy feature modules in the background so the first
+# chat message, upload or tool click does not pay for them
+if os.getenv("NOTEBOOKLM_WARMUP", "").lower() in ("1", "true", "yes"):
+    from src.utils.warmup import start_warmup
+    start_warmup()
+
 # Initialize session state variables if they don't exist
 if 'sources' not in st.session_state:
     st.session_state.sources = []
@@ -8,6 +15,8 @@ if 'chat_messages' not in st.session_state:
     st.session_state.chat_messages = []
 if 'notes' not in st.session_state:
     st.session_state.notes = []
+if 'source_ids' not in st.session_state:
+    st.session_state.source_ids = {}
 
 st.set_page_config(layout="wide", page_title="NotebookLM")
 